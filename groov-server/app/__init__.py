@@ -0,0 +1,5 @@
+from app.settings import load_env
+
+# 진입점(app.asgi, uvicorn --factory app.main:create_app, app.main:app, app.migrate)과 상관없이
+# 모듈 상수가 os.getenv 로 읽히기 전에 .env 를 불러온다. 이미 설정된 환경 변수는 덮어쓰지 않는다.
+load_env()
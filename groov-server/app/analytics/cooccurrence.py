@@ -0,0 +1,162 @@
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+from scipy import sparse
+
+LOW_BITS = np.int64(0xFFFFFFFF)
+
+# 곡 쌍 (i, j) 를 i << 32 | j 하나의 int64 키로 표현한 희소 동시 구매 행렬
+def pair_keys(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    return (left.astype(np.int64) << 32) | right.astype(np.int64)
+
+def merge_pairs(keys: list[np.ndarray], counts: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    if not keys:
+        return np.empty(0, np.int64), np.empty(0, np.int32)
+    unique, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    return unique, np.bincount(inverse, weights=np.concatenate(counts)).astype(np.int32)
+
+# 사용자×곡 구매 행렬 A 에 대해 Aᵀ·A 의 대각 밖 원소가 곡 쌍별 동시 구매 수이다.
+def cooccurrence(users: np.ndarray, songs: np.ndarray, song_count: int, max_items_per_user: int) -> tuple[np.ndarray, np.ndarray]:
+    if len(users) == 0:
+        return merge_pairs([], [])
+    order = np.lexsort((songs, users))
+    users, songs = users[order], songs[order]
+    starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+    sizes = np.diff(np.r_[starts, len(users)])
+    keep = np.arange(len(users)) - np.repeat(starts, sizes) < max_items_per_user
+    users, songs = users[keep], songs[keep]
+
+    purchases = sparse.csr_matrix(
+        (np.ones(len(users), np.int32), (users, songs)), shape=(int(users.max()) + 1, song_count)
+    )
+    co = (purchases.T @ purchases).tocoo()
+    off_diagonal = co.row != co.col
+    keys = pair_keys(co.row[off_diagonal], co.col[off_diagonal])
+    order = np.argsort(keys)
+    return keys[order], co.data[off_diagonal][order].astype(np.int32)
+
+def similarity(keys: np.ndarray, counts: np.ndarray, buyers: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    left = keys >> 32
+    right = keys & LOW_BITS
+    scores = counts / np.sqrt(buyers[left].astype(np.float64) * buyers[right])
+    return left, right, scores
+
+# 코사인 유사도 기준 곡별 상위 k 개 (-1 은 빈 칸)
+def top_k(keys: np.ndarray, counts: np.ndarray, buyers: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    size = len(buyers)
+    neighbors = np.full((size, k), -1, np.int32)
+    weights = np.zeros((size, k), np.float32)
+    if len(keys) == 0:
+        return neighbors, weights
+
+    left, right, scores = similarity(keys, counts, buyers)
+    order = np.lexsort((-scores, left))
+    left, right, scores = left[order], right[order], scores[order]
+    rank = np.arange(len(left)) - np.searchsorted(left, left)
+    keep = rank < k
+    neighbors[left[keep], rank[keep]] = right[keep]
+    weights[left[keep], rank[keep]] = scores[keep]
+    return neighbors, weights
+
+@dataclass
+class Recommendations:
+    song_ids: np.ndarray
+    keys: np.ndarray
+    counts: np.ndarray
+    buyers: np.ndarray
+    neighbors: np.ndarray
+    weights: np.ndarray
+    built_at: float
+
+    @classmethod
+    def empty(cls, k: int):
+        return cls(
+            song_ids=np.empty(0, dtype=str),
+            keys=np.empty(0, np.int64),
+            counts=np.empty(0, np.int32),
+            buyers=np.empty(0, np.int32),
+            neighbors=np.empty((0, k), np.int32),
+            weights=np.empty((0, k), np.float32),
+            built_at=0.0,
+        )
+
+# 새 구매로 생긴 곡 쌍(left[i], right[i])과 구매된 곡(bought)을 더하고, 영향받은 곡의 행만 다시 고른다.
+def apply_purchases(state: Recommendations, song_ids: list[str], left: list[int], right: list[int], bought: list[int], k: int) -> Recommendations:
+    buyers = np.zeros(len(song_ids), np.int32)
+    buyers[: len(state.buyers)] = state.buyers
+    np.add.at(buyers, np.array(bought), 1)
+    delta = pair_keys(np.array(left, np.int64), np.array(right, np.int64))
+    keys, counts = merge_pairs([state.keys, delta], [state.counts, np.ones(len(delta), np.int32)])
+
+    neighbors = np.full((len(song_ids), k), -1, np.int32)
+    weights = np.zeros((len(song_ids), k), np.float32)
+    neighbors[: len(state.neighbors)] = state.neighbors
+    weights[: len(state.weights)] = state.weights
+    for row in np.unique(np.r_[np.array(left, np.int64), np.array(bought, np.int64)]):
+        lo, hi = np.searchsorted(keys, [np.int64(row) << 32, np.int64(row + 1) << 32])
+        _, row_right, row_scores = similarity(keys[lo:hi], counts[lo:hi], buyers)
+        best = np.argsort(-row_scores, kind="stable")[: k]
+        neighbors[row] = -1
+        weights[row] = 0
+        neighbors[row, : len(best)] = row_right[best]
+        weights[row, : len(best)] = row_scores[best]
+
+    return Recommendations(
+        song_ids=np.array(song_ids, dtype=str),
+        keys=keys,
+        counts=counts,
+        buyers=buyers,
+        neighbors=neighbors,
+        weights=weights,
+        built_at=state.built_at,
+    )
+
+def build(users: list[list[int]], songs: list[list[int]], song_ids: list[str], k: int, max_items_per_user: int) -> Recommendations:
+    users = np.fromiter((u for batch in users for u in batch), np.int32)
+    songs = np.fromiter((s for batch in songs for s in batch), np.int32)
+    keys, counts = cooccurrence(users, songs, len(song_ids), max_items_per_user)
+    buyers = np.bincount(songs, minlength=len(song_ids)).astype(np.int32)
+    neighbors, weights = top_k(keys, counts, buyers, k)
+    return Recommendations(
+        song_ids=np.array(song_ids, dtype=str),
+        keys=keys,
+        counts=counts,
+        buyers=buyers,
+        neighbors=neighbors,
+        weights=weights,
+        built_at=time.time(),
+    )
+
+def save_state(path: Path, state: Recommendations):
+    partial = path.with_name(path.name + ".part")
+    with partial.open("wb") as f:
+        np.savez_compressed(
+            f,
+            song_ids=state.song_ids,
+            keys=state.keys,
+            counts=state.counts,
+            buyers=state.buyers,
+            neighbors=state.neighbors,
+            weights=state.weights,
+            built_at=np.float64(state.built_at),
+        )
+    os.replace(partial, path)
+
+def load_state(path: Path) -> Recommendations | None:
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            state = Recommendations(
+                song_ids=data["song_ids"],
+                keys=data["keys"],
+                counts=data["counts"],
+                buyers=data["buyers"],
+                neighbors=data["neighbors"],
+                weights=data["weights"],
+                built_at=float(data["built_at"]),
+            )
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+    return state
+
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from sqlalchemy import bindparam, func
+from starlette.concurrency import run_in_threadpool
+
+from app.database.database import SessionLocal
+from app.database.models import Song
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", 5))
+COUNTER_FLUSH_THRESHOLD = int(os.getenv("COUNTER_FLUSH_THRESHOLD", 1000))
+COUNTER_FIELDS = ("download_count", "play_count")
+
+songs_table = Song.__table__
+
+# 증분만 모아 "count = count + n" 으로 반영하므로 여러 워커가 각자 flush 해도 합이 맞는다.
+# 행 잠금 순서를 고정하기 위해 song id 순으로 정렬해 한 트랜잭션에서 갱신한다.
+COUNTER_UPDATE = (
+    songs_table.update()
+    .where(songs_table.c.id == bindparam("b_song_id"))
+    .values(
+        download_count=func.coalesce(songs_table.c.download_count, 0) + bindparam("b_download_count"),
+        play_count=func.coalesce(songs_table.c.play_count, 0) + bindparam("b_play_count"),
+    )
+)
+
+class CounterAggregator:
+    def __init__(self, interval: float = COUNTER_FLUSH_INTERVAL, threshold: int = COUNTER_FLUSH_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self._pending: dict[str, Counter] = defaultdict(Counter)
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def record(self, song_id: str, field: str, amount: int = 1):
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f"unknown counter: {field}")
+        with self._lock:
+            self._pending[song_id][field] += amount
+            self._pending_total += amount
+            if self._pending_total >= self.threshold:
+                self._flush_requested.set()
+
+    def pending(self, song_id: str) -> Counter:
+        with self._lock:
+            return Counter(self._pending.get(song_id, ()))
+
+    # 삭제된 곡의 아직 flush 되지 않은 증분을 버린다.
+    def discard(self, song_ids):
+        with self._lock:
+            for song_id in song_ids:
+                counts = self._pending.pop(song_id, None)
+                if counts:
+                    self._pending_total -= sum(counts.values())
+
+    def _drain(self) -> dict[str, Counter]:
+        with self._lock:
+            batch, self._pending = self._pending, defaultdict(Counter)
+            self._pending_total = 0
+            return batch
+
+    def _restore(self, batch: dict[str, Counter]):
+        with self._lock:
+            for song_id, counts in batch.items():
+                self._pending[song_id].update(counts)
+                self._pending_total += sum(counts.values())
+
+    def _write(self, batch: dict[str, Counter]):
+        params = [
+            {
+                "b_song_id": song_id,
+                "b_download_count": batch[song_id]["download_count"],
+                "b_play_count": batch[song_id]["play_count"],
+            }
+            for song_id in sorted(batch)
+        ]
+        db = SessionLocal()
+        try:
+            db.connection().execute(COUNTER_UPDATE, params)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def flush(self) -> int:
+        batch = self._drain()
+        if not batch:
+            return 0
+        try:
+            await run_in_threadpool(self._write, batch)
+        except Exception:
+            logger.exception("counter flush failed, %s songs kept for retry", len(batch))
+            self._restore(batch)
+            return 0
+        return len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            # asyncio 객체는 처음 쓰인 이벤트 루프에 묶이므로 시작할 때 새로 만든다 (앱을 다시 띄우는 경우).
+            self._flush_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    # 종료 시 남은 증분을 모두 기록한다.
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+counters = CounterAggregator()
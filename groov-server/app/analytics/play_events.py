@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+
+from app.database.database import SessionLocal
+from app.database.models import PlayEvent
+
+logger = logging.getLogger(__name__)
+
+PLAY_EVENT_FLUSH_INTERVAL = float(os.getenv("PLAY_EVENT_FLUSH_INTERVAL", 2))
+PLAY_EVENT_FLUSH_THRESHOLD = int(os.getenv("PLAY_EVENT_FLUSH_THRESHOLD", 5000))
+# DB 가 느려 이만큼 쌓이면 새 이벤트를 받지 않는다 (클라이언트는 503 을 받고 나중에 다시 보낸다).
+PLAY_EVENT_BUFFER_LIMIT = int(os.getenv("PLAY_EVENT_BUFFER_LIMIT", 200_000))
+PLAY_EVENT_INSERT_CHUNK = int(os.getenv("PLAY_EVENT_INSERT_CHUNK", 5000))
+# 곡 처음(이 위치(초)보다 앞)에서 시작한 구간을 재생 1회로 센다. 이어지는 구간은 같은 재생이다.
+PLAY_START_POSITION = float(os.getenv("PLAY_START_POSITION", 1))
+
+play_events_table = PlayEvent.__table__
+PLAY_EVENT_INSERT = insert(play_events_table)
+
+# 다른 테이블과 같이 서버 로컬 시각(naive)으로 저장한다.
+def local_time(value: datetime) -> datetime:
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+# 배치에 담긴 곡별 재생 횟수 (songs.play_count 증분)
+def play_starts(events) -> Counter:
+    return Counter(event.song_id for event in events if event.position < PLAY_START_POSITION)
+
+# 요청마다 INSERT 하지 않고 메모리에 모았다가 주기적으로, 또는 임계치를 넘으면 executemany 로 한꺼번에 넣는다.
+# 프로세스가 비정상 종료되면 아직 flush 되지 않은 이벤트는 잃는다 (분석용이라 허용한다).
+class PlayEventBuffer:
+    def __init__(
+        self,
+        interval: float = PLAY_EVENT_FLUSH_INTERVAL,
+        threshold: int = PLAY_EVENT_FLUSH_THRESHOLD,
+        limit: int = PLAY_EVENT_BUFFER_LIMIT,
+        chunk: int = PLAY_EVENT_INSERT_CHUNK,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.limit = limit
+        self.chunk = chunk
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self._pending: deque[dict] = deque()
+        self._lock = threading.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # 버퍼에 자리가 없으면 한 건도 받지 않고 False 를 반환한다.
+    def record_many(self, events, user_id: str | None = None) -> bool:
+        received_at = datetime.now()
+        rows = [
+            {
+                "song_id": event.song_id,
+                "user_id": user_id,
+                "position": event.position,
+                "listened": event.listened,
+                "played_at": local_time(event.played_at) if event.played_at else received_at,
+                "received_at": received_at,
+            }
+            for event in events
+        ]
+        with self._lock:
+            if len(self._pending) + len(rows) > self.limit:
+                self.rejected += len(rows)
+                return False
+            self._pending.extend(rows)
+            self.accepted += len(rows)
+            if len(self._pending) >= self.threshold:
+                self._flush_requested.set()
+        return True
+
+    def _take(self) -> list[dict]:
+        with self._lock:
+            count = min(self.chunk, len(self._pending))
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _restore(self, batch: list[dict]):
+        with self._lock:
+            self._pending.extendleft(reversed(batch))
+
+    def _write(self, batch: list[dict]):
+        db = SessionLocal()
+        try:
+            db.connection().execute(PLAY_EVENT_INSERT, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # 한 번에 chunk 개씩 나눠 넣어 트랜잭션을 짧게 유지한다.
+    async def flush(self) -> int:
+        written = 0
+        while batch := self._take():
+            try:
+                await run_in_threadpool(self._write, batch)
+            except Exception:
+                logger.exception("play event flush failed, %s events kept for retry", len(batch))
+                self._restore(batch)
+                break
+            written += len(batch)
+            self.written += len(batch)
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            # asyncio 객체는 처음 쓰인 이벤트 루프에 묶이므로 시작할 때 새로 만든다 (앱을 다시 띄우는 경우).
+            self._flush_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    # 종료 시 남은 이벤트를 모두 기록한다.
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+play_events = PlayEventBuffer()
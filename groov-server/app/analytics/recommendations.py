@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.database.database import SessionLocal
+from app.database.models import user_downloads
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+RECOMMEND_TOP_K = int(os.getenv("RECOMMEND_TOP_K", 20))
+RECOMMEND_REFRESH_INTERVAL = float(os.getenv("RECOMMEND_REFRESH_INTERVAL", 60))
+RECOMMEND_REBUILD_INTERVAL = float(os.getenv("RECOMMEND_REBUILD_INTERVAL", 6 * 3600))
+# 구매 곡이 아주 많은 사용자는 쌍의 수가 제곱으로 늘어나므로 일부만 사용한다.
+RECOMMEND_MAX_ITEMS_PER_USER = int(os.getenv("RECOMMEND_MAX_ITEMS_PER_USER", 500))
+LOAD_BATCH_SIZE = 50_000
+
+# user_downloads 로 "이 곡을 산 사람들이 함께 산 곡" 을 미리 계산해 둔다.
+# 주기적으로 전체를 다시 만들고, 그 사이 결제는 해당 사용자의 구매 목록만 읽어 영향받은 곡의 행만 갱신한다.
+# 증분은 결제를 처리한 워커에만 반영되며 다른 워커는 다음 전체 재계산 때 맞춰진다.
+class RecommendationService:
+    def __init__(
+        self,
+        path: Path = Settings.recommend_path,
+        k: int = RECOMMEND_TOP_K,
+        refresh_interval: float = RECOMMEND_REFRESH_INTERVAL,
+        rebuild_interval: float = RECOMMEND_REBUILD_INTERVAL,
+    ):
+        self.path = Path(path)
+        self.k = k
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._current: tuple = (None, {})
+        self._pending: list[tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def state(self):
+        return self._current[0]
+
+    def similar(self, song_id: str, limit: int | None = None) -> list[tuple[str, float]]:
+        state, index = self._current
+        row = index.get(song_id)
+        if state is None or row is None or row >= len(state.neighbors):
+            return []
+        neighbors, weights = state.neighbors[row], state.weights[row]
+        return [
+            (str(state.song_ids[neighbor]), float(weight))
+            for neighbor, weight in zip(neighbors[:limit], weights[:limit])
+            if neighbor >= 0
+        ]
+
+    def record(self, user_id: str, song_id: str):
+        with self._lock:
+            self._pending.append((user_id, song_id))
+
+    def _publish(self, state):
+        self._current = (state, {str(song_id): row for row, song_id in enumerate(state.song_ids)})
+
+    # numpy/scipy 는 계산할 때 처음 불러온다.
+    def rebuild(self):
+        from app.analytics.cooccurrence import build
+
+        started = time.monotonic()
+        user_index: dict[str, int] = {}
+        song_index: dict[str, int] = {}
+        users, songs = [], []
+        with self._lock:
+            # 읽는 동안 들어온 결제는 다시 더해질 수 있으나 다음 재계산에서 바로잡힌다.
+            self._pending.clear()
+        with SessionLocal() as db:
+            result = db.execute(
+                select(user_downloads.c.user_id, user_downloads.c.song_id).execution_options(stream_results=True)
+            )
+            for rows in result.partitions(LOAD_BATCH_SIZE):
+                users.append([user_index.setdefault(user_id, len(user_index)) for user_id, _ in rows])
+                songs.append([song_index.setdefault(song_id, len(song_index)) for _, song_id in rows])
+
+        state = build(users, songs, list(song_index), self.k, RECOMMEND_MAX_ITEMS_PER_USER)
+        self._publish(state)
+        logger.info(
+            "recommendations rebuilt: %s songs, %s pairs in %.1fs", len(song_index), len(state.keys), time.monotonic() - started
+        )
+        return state
+
+    def refresh(self) -> int:
+        from app.analytics.cooccurrence import Recommendations, apply_purchases
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        new_songs: dict[str, set[str]] = defaultdict(set)
+        for user_id, song_id in pending:
+            new_songs[user_id].add(song_id)
+        owned: dict[str, set[str]] = defaultdict(set)
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(user_downloads.c.user_id, user_downloads.c.song_id).where(user_downloads.c.user_id.in_(new_songs))
+            )
+            for user_id, song_id in rows:
+                owned[user_id].add(song_id)
+
+        state, index = self._current
+        if state is None:
+            state = Recommendations.empty(self.k)
+        song_ids = list(state.song_ids)
+        index = dict(index)
+        def row_of(song_id: str) -> int:
+            if song_id not in index:
+                index[song_id] = len(song_ids)
+                song_ids.append(song_id)
+            return index[song_id]
+
+        # 전체 재계산과 같이 사용자당 RECOMMEND_MAX_ITEMS_PER_USER 곡까지만 쌍을 만든다.
+        # 구매자 수(bought)는 상한과 무관하게 모두 더한다.
+        left, right = [], []
+        bought = []
+        for user_id, added in new_songs.items():
+            added = {row_of(song_id) for song_id in added & owned[user_id]}
+            bought += added
+            before = sorted({row_of(song_id) for song_id in owned[user_id]} - added)[:RECOMMEND_MAX_ITEMS_PER_USER]
+            added = set(sorted(added)[: RECOMMEND_MAX_ITEMS_PER_USER - len(before)])
+            for a in added:
+                for b in before:
+                    left += [a, b]
+                    right += [b, a]
+                for b in added - {a}:
+                    left.append(a)
+                    right.append(b)
+        if not bought:
+            return 0
+
+        self._publish(apply_purchases(state, song_ids, left, right, bought, self.k))
+        return len(bought)
+
+    def save(self):
+        from app.analytics.cooccurrence import save_state
+
+        if self.state is not None:
+            save_state(self.path, self.state)
+
+    def load(self) -> bool:
+        from app.analytics.cooccurrence import load_state
+
+        state = load_state(self.path)
+        if state is None or state.neighbors.shape[1] != self.k:
+            return False
+        self._publish(state)
+        return True
+
+    def _tick(self):
+        if self.state is None or time.time() - self.state.built_at >= self.rebuild_interval:
+            self.rebuild()
+            self.save()
+        elif self.refresh():
+            self.save()
+
+    async def _run(self):
+        while True:
+            try:
+                await run_in_threadpool(self._tick)
+            except Exception:
+                logger.exception("recommendation refresh failed")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def start(self):
+        if self._task is None:
+            await run_in_threadpool(self.load)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+recommendations = RecommendationService()
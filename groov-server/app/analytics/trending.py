@@ -0,0 +1,221 @@
+import asyncio
+import heapq
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from starlette.concurrency import run_in_threadpool
+
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+TRENDING_SIZE = int(os.getenv("TRENDING_SIZE", 100))
+TRENDING_FLUSH_INTERVAL = float(os.getenv("TRENDING_FLUSH_INTERVAL", 30))
+
+EVENT_WEIGHTS = {"purchase": 5.0, "download": 1.0}
+# 차트별 반감기(초). None 은 감쇠 없는 누적 점수.
+CHART_HALF_LIVES = {"daily": 12 * 3600, "weekly": 3.5 * 86400, "all-time": None}
+
+# 점수는 고정 기준 시각부터의 forward decay 를 로그 공간에 저장한다.
+# 이벤트 가중치 w·2^((t - EPOCH) / half_life) 의 합이므로 시간이 지나도 곡 사이 순서가 바뀌지 않고,
+# 점수는 증가만 해서 상위 N 개를 힙으로 유지할 수 있다. 실제 점수는 조회 시점 기준으로 되돌려 계산한다.
+TRENDING_EPOCH = 1_704_067_200.0  # 2024-01-01T00:00:00Z
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trending (
+    chart TEXT NOT NULL,
+    song_id TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (chart, song_id)
+);
+CREATE INDEX IF NOT EXISTS ix_trending_chart_score ON trending (chart, score DESC);
+"""
+
+def logaddexp(a: float | None, b: float) -> float:
+    if a is None:
+        return b
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+def log_weight(half_life: float | None, weight: float, at: float) -> float:
+    if half_life is None:
+        return math.log(weight)
+    return math.log(weight) + (at - TRENDING_EPOCH) * math.log(2) / half_life
+
+def current_score(half_life: float | None, log_score: float, now: float) -> float:
+    if half_life is None:
+        return math.exp(log_score)
+    return math.exp(log_score - (now - TRENDING_EPOCH) * math.log(2) / half_life)
+
+# 점수가 증가만 하는 항목들의 상위 N 개. 갱신 전 항목은 힙에 남겨 두고 꺼낼 때 건너뛴다.
+class TopN:
+    def __init__(self, size: int):
+        self.size = size
+        self.members: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._ranked: list[tuple[str, float]] | None = None
+
+    def _floor(self) -> tuple[float, str]:
+        while self._heap:
+            score, song_id = self._heap[0]
+            if self.members.get(song_id) == score:
+                return score, song_id
+            heapq.heappop(self._heap)
+        return -math.inf, ""
+
+    def offer(self, song_id: str, score: float):
+        if song_id not in self.members and len(self.members) >= self.size:
+            floor, floor_id = self._floor()
+            if score <= floor:
+                return
+            del self.members[floor_id]
+            heapq.heappop(self._heap)
+        self.members[song_id] = score
+        heapq.heappush(self._heap, (score, song_id))
+        self._ranked = None
+        if len(self._heap) > 2 * self.size:
+            self._heap = [(score, song_id) for song_id, score in self.members.items()]
+            heapq.heapify(self._heap)
+
+    def replace(self, rows):
+        self.members = dict(rows)
+        self._heap = [(score, song_id) for song_id, score in self.members.items()]
+        heapq.heapify(self._heap)
+        self._ranked = None
+
+    def ranked(self) -> list[tuple[str, float]]:
+        if self._ranked is None:
+            self._ranked = sorted(self.members.items(), key=lambda item: item[1], reverse=True)
+        return self._ranked
+
+# 결제/다운로드 이벤트로 차트를 갱신한다. 워커마다 메모리에 모은 증분을 주기적으로 SQLite 파일에 합치고
+# 합쳐진 상위 N 개를 다시 읽어 오므로, 여러 uvicorn 워커의 차트가 flush 주기 안에서 일치한다.
+class TrendingCharts:
+    def __init__(self, path: str | Path = Settings.trending_path, size: int = TRENDING_SIZE, interval: float = TRENDING_FLUSH_INTERVAL):
+        self.path = str(path)
+        self.size = size
+        self.interval = interval
+        self.charts = {chart: TopN(size) for chart in CHART_HALF_LIVES}
+        self._pending: dict[str, dict[str, float]] = defaultdict(dict)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._task: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # create_app 이 path 를 설정으로 바꾸면 이전 경로의 연결은 버린다.
+        if conn is None or self._local.path != self.path:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._local.path = self.path
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            conn.create_function("logaddexp", 2, logaddexp, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    def record(self, song_id: str, event: str, at: float | None = None):
+        weight = EVENT_WEIGHTS[event]
+        at = time.time() if at is None else at
+        with self._lock:
+            for chart, half_life in CHART_HALF_LIVES.items():
+                delta = log_weight(half_life, weight, at)
+                pending = self._pending[chart]
+                pending[song_id] = logaddexp(pending.get(song_id), delta)
+                # 상위 N 밖의 곡은 이 워커의 증분만 알고 있으므로 하한값으로 비교하고, flush 후 다시 맞춘다.
+                top = self.charts[chart]
+                top.offer(song_id, logaddexp(top.members.get(song_id), delta))
+
+    def chart(self, chart: str, limit: int | None = None, now: float | None = None) -> list[dict]:
+        half_life = CHART_HALF_LIVES[chart]
+        now = time.time() if now is None else now
+        with self._lock:
+            ranked = self.charts[chart].ranked()[:limit]
+        return [
+            {"rank": rank, "songId": song_id, "score": round(current_score(half_life, score, now), 4)}
+            for rank, (song_id, score) in enumerate(ranked, start=1)
+        ]
+
+    def remove(self, song_id: str):
+        with self._lock:
+            for chart, top in self.charts.items():
+                self._pending[chart].pop(song_id, None)
+                if song_id in top.members:
+                    top.replace((key, score) for key, score in top.members.items() if key != song_id)
+        self._connect().execute("DELETE FROM trending WHERE song_id = ?", (song_id,))
+
+    def _write(self, batch: dict[str, dict[str, float]]):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO trending (chart, song_id, score) VALUES (?, ?, ?) "
+                "ON CONFLICT (chart, song_id) DO UPDATE SET score = logaddexp(score, excluded.score)",
+                [(chart, song_id, score) for chart, scores in batch.items() for song_id, score in sorted(scores.items())],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _read(self) -> dict[str, list[tuple[str, float]]]:
+        conn = self._connect()
+        return {
+            chart: conn.execute(
+                "SELECT song_id, score FROM trending WHERE chart = ? ORDER BY score DESC LIMIT ?", (chart, self.size)
+            ).fetchall()
+            for chart in CHART_HALF_LIVES
+        }
+
+    def _reload(self, merged: dict[str, list[tuple[str, float]]]):
+        with self._lock:
+            for chart, rows in merged.items():
+                top = self.charts[chart]
+                top.replace(rows)
+                # 읽는 동안 새로 들어온 증분을 다시 얹는다.
+                for song_id, delta in self._pending[chart].items():
+                    top.offer(song_id, logaddexp(top.members.get(song_id), delta))
+
+    async def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, defaultdict(dict)
+        try:
+            if batch:
+                await run_in_threadpool(self._write, batch)
+            merged = await run_in_threadpool(self._read)
+        except Exception:
+            logger.exception("trending flush failed, %s charts kept for retry", len(batch))
+            with self._lock:
+                for chart, scores in batch.items():
+                    pending = self._pending[chart]
+                    for song_id, score in scores.items():
+                        pending[song_id] = logaddexp(pending.get(song_id), score)
+            return 0
+        self._reload(merged)
+        return sum(len(scores) for scores in batch.values())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            await self.flush()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+trending = TrendingCharts()
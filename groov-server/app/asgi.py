@@ -0,0 +1,9 @@
+"""uvicorn 진입점.
+
+    uvicorn app.asgi:app
+    uvicorn --factory app.main:create_app
+    uvicorn app.main:app  (예전 진입점, 첫 요청 전에 앱을 만든다)
+"""
+from app.main import create_app
+
+app = create_app()
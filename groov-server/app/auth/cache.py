@@ -0,0 +1,63 @@
+import datetime
+import os
+import threading
+from dataclasses import dataclass
+from cachetools import TTLCache
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 300))
+
+# 인증된 사용자 정보 (세션과 분리된 값 객체이므로 요청 간에 안전하게 공유할 수 있다)
+@dataclass(frozen=True)
+class Principal:
+    id: str
+    name: str | None = None
+    email: str | None = None
+    image: str | None = None
+    created_at: datetime.datetime | None = None
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(id=user.id, name=user.name, email=user.email, image=user.image, created_at=user.created_at)
+
+class PrincipalCache:
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Principal | None:
+        with self._lock:
+            principal = self._cache.get(user_id)
+            if principal is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return principal
+
+    def put(self, principal: Principal):
+        with self._lock:
+            self._cache[principal.id] = principal
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": self.hits / total if total else 0.0,
+            }
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 구글 로그인 환경 변수
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+# 테스트용 로컬 인증서 파일 ({kid: PEM} JSON). 지정하면 네트워크를 사용하지 않는다.
+GOOGLE_CERTS_FILE = os.getenv("GOOGLE_CERTS_FILE")
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+GOOGLE_CERTS_DEFAULT_MAX_AGE = 3600
+GOOGLE_CERTS_MIN_REFRESH_INTERVAL = 30
+GOOGLE_CLOCK_SKEW = 10
+
+def parse_max_age(cache_control: str | None) -> int | None:
+    if not cache_control:
+        return None
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else None
+
+def token_kid(token: str) -> str | None:
+    from google.auth import jwt
+
+    try:
+        return jwt.decode_header(token).get("kid")
+    except Exception:
+        return None
+
+# 구글 공개 인증서를 Cache-Control max-age 동안 캐시하고 만료 전에 백그라운드에서 갱신한다.
+class GoogleTokenVerifier:
+    def __init__(
+        self,
+        client_id: str | None = GOOGLE_CLIENT_ID,
+        certs_url: str = GOOGLE_CERTS_URL,
+        certs_file: str | None = GOOGLE_CERTS_FILE,
+    ):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.certs_file = certs_file
+        self._certs: dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+        self._session = None
+
+    def load_local_certs(self, certs: dict[str, str]):
+        self._certs = dict(certs)
+        self._expires_at = float("inf")
+
+    async def _fetch(self) -> tuple[dict[str, str], int]:
+        if self.certs_file:
+            return json.loads(Path(self.certs_file).read_text()), GOOGLE_CERTS_DEFAULT_MAX_AGE
+
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        async with self._session.get(self.certs_url) as response:
+            response.raise_for_status()
+            certs = await response.json(content_type=None)
+            max_age = parse_max_age(response.headers.get("Cache-Control"))
+        return certs, max_age or GOOGLE_CERTS_DEFAULT_MAX_AGE
+
+    async def refresh(self, force: bool = False):
+        async with self._lock:
+            now = time.monotonic()
+            if not force and self._certs and now < self._expires_at:
+                return
+            if force and now - self._last_fetch < GOOGLE_CERTS_MIN_REFRESH_INTERVAL:
+                return
+            certs, max_age = await self._fetch()
+            self._certs = certs
+            self._last_fetch = now
+            self._expires_at = now + max_age
+
+    async def _refresh_loop(self):
+        while True:
+            # 만료 직전(수명의 90%)에 갱신해 로그인 요청이 인증서 조회를 기다리지 않게 한다.
+            delay = max((self._expires_at - time.monotonic()) * 0.9, GOOGLE_CERTS_MIN_REFRESH_INTERVAL)
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh(force=True)
+            except Exception:
+                logger.exception("google certs refresh failed")
+
+    async def start(self):
+        # asyncio 객체는 처음 쓰인 이벤트 루프에 묶이므로 시작할 때 새로 만든다 (앱을 다시 띄우는 경우).
+        self._lock = asyncio.Lock()
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("google certs prefetch failed")
+        if self._refresh_task is None and self._expires_at != float("inf"):
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def verify(self, token: str) -> dict:
+        from google.auth import jwt
+
+        try:
+            await self.refresh()
+        except Exception:
+            # 갱신에 실패해도 이전 인증서가 있으면 그대로 사용한다.
+            if not self._certs:
+                raise
+            logger.warning("google certs refresh failed, using stale certs", exc_info=True)
+        kid = token_kid(token)
+        # 키 교체 직후 새 kid 로 서명된 토큰이면 한 번 강제로 갱신한다.
+        if kid and kid not in self._certs:
+            try:
+                await self.refresh(force=True)
+            except Exception:
+                logger.warning("google certs refresh for kid %s failed", kid, exc_info=True)
+
+        id_info = jwt.decode(
+            token,
+            certs=self._certs,
+            audience=self.client_id,
+            clock_skew_in_seconds=GOOGLE_CLOCK_SKEW,
+        )
+        if id_info.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {id_info.get('iss')}")
+        return id_info
+
+google_verifier = GoogleTokenVerifier()
@@ -1,22 +1,14 @@
 import os
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
-from google.auth.transport import requests as google_requests
-from sqlalchemy import delete
-from sqlalchemy.orm import Session
-from mutagen.mp3 import MP3
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth.cache import Principal, principal_cache
 from app.database.models import User
-from app.database.schemas import User as UserSchema, Song as SongSchema
-from app.database.database import get_db
-
-app = FastAPI()
-
-# 구글 로그인 환경 변수
-GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+from app.database.database import get_async_db
 
 # JWT 환경 변수
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
@@ -25,7 +17,11 @@ JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# 읽기 전용 엔드포인트에서 DB 확인 없이 서명된 클레임만 신뢰할지 여부
+AUTH_TRUST_CLAIMS = os.getenv("AUTH_TRUST_CLAIMS", "false").lower() == "true"
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -41,19 +37,41 @@ def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, JWT_REFRESH_SECRET_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-        if user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+    return payload
 
-        user = db.query(User).filter(User.id == user_id).first()
-        if user is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+async def load_principal(user_id: str, db: AsyncSession) -> Principal:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
 
-        return user
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalars().first()
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
\ No newline at end of file
+    principal = Principal.from_user(user)
+    principal_cache.put(principal)
+    return principal
+
+async def verify_token(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    payload = decode_token(token)
+    return await load_principal(payload["sub"], db)
+
+# 읽기 전용 엔드포인트용: AUTH_TRUST_CLAIMS 가 켜져 있으면 DB/캐시 없이 토큰 클레임만 사용한다.
+async def verify_claims(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    payload = decode_token(token)
+    if AUTH_TRUST_CLAIMS:
+        return Principal(id=payload["sub"], name=payload.get("name"))
+    return await load_principal(payload["sub"], db)
+
+# 비로그인 요청도 받는 엔드포인트용: 토큰이 있으면 서명만 확인해 사용자 id 를 돌려준다.
+async def optional_user_id(token: str | None = Depends(optional_oauth2_scheme)) -> str | None:
+    return decode_token(token)["sub"] if token else None
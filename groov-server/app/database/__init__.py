@@ -1,4 +1,4 @@
-from .database import Base, engine, SessionLocal
+from .database import Base, get_engine, SessionLocal
 from .models import *
 from .schemas import *
 # from .crud import *
\ No newline at end of file
@@ -1,22 +1,119 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 import os
 
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+# 커넥션 풀 설정
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE URL is not set in environment.")
+# 비동기 드라이버 매핑 (ASYNC_DATABASE_URL 로 직접 지정할 수도 있다)
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def engine_options(url: str) -> dict:
+    # SQLite 는 로컬 테스트용이므로 풀 크기 설정 없이 스레드 간 공유만 허용한다.
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+# 동기/비동기 엔진이 같은 SQLite 파일을 함께 쓰므로, 읽기와 쓰기가 서로 막지 않도록 WAL 로 열고
+# 잠금 충돌 시 바로 "database is locked" 를 내지 않고 잠시 기다리게 한다.
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 30_000))
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def configure_sqlite(engine, url: str):
+    if make_url(url).get_backend_name() == "sqlite":
+        event.listen(engine, "connect", set_sqlite_pragmas)
+
+def async_database_url(url: str) -> str:
+    explicit = os.getenv("ASYNC_DATABASE_URL")
+    if explicit:
+        return explicit
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+# 엔진은 create_app 에서 configure_database 로 만든다. 그 전에는 세션이 바인딩되지 않는다.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
+_database_url: str | None = None
+_engine = None
+_async_engine = None
+_AsyncSessionLocal = None
+
+def configure_database(url: str | None = None):
+    global _database_url, _engine, _async_engine
+    url = url or os.getenv("DATABASE_URL")
+    if not url:
+        raise ValueError("DATABASE URL is not set in environment.")
+    if _engine is not None and url == _database_url:
+        return _engine
+    _database_url = url
+    # 다른 DB 로 바뀌면 비동기 엔진도 다음 사용 시 새 주소로 다시 만든다.
+    _async_engine = None
+    _engine = create_engine(url, **engine_options(url))
+    configure_sqlite(_engine, url)
+    SessionLocal.configure(bind=_engine)
+    return _engine
+
+def get_engine():
+    return _engine if _engine is not None else configure_database()
+
+def current_engine():
+    return _engine
+
+# 비동기 드라이버는 실제로 사용할 때 처음 로드한다.
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+        get_engine()
+        url = async_database_url(_database_url)
+        _async_engine = create_async_engine(url, **engine_options(url))
+        configure_sqlite(_async_engine.sync_engine, url)
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+def current_async_engine():
+    return _async_engine
+
+def async_session():
+    get_async_engine()
+    return _AsyncSessionLocal()
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
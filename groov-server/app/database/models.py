@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Table, Text
+from sqlalchemy import Column, String, Integer, BigInteger, Float, DateTime, ForeignKey, Table, Text
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
@@ -17,7 +17,7 @@ class User(Base):
     name = Column(String(10), nullable=False)
     image = Column(String(255), nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.datetime.now())
+    created_at = Column(DateTime, default=datetime.datetime.now)
 
     uploads = relationship("Song", back_populates="owner")
     downloads = relationship("Song", secondary=user_downloads, back_populates="downloaded_by")
@@ -28,11 +28,14 @@ class Song(Base):
     id = Column(String(255), primary_key=True, index=True)
     title = Column(String(20), index=True)
     image = Column(String(255), nullable=False)
+    image_key = Column(String(64), nullable=True)
     file_url = Column(String(255), nullable=False)
-    upload_date = Column(DateTime, default=datetime.datetime.now())
+    upload_date = Column(DateTime, default=datetime.datetime.now)
     duration = Column(Float, nullable=False)
     download_count = Column(Integer, default=0)
+    play_count = Column(Integer, default=0)
     description = Column(String(20), nullable=False)
+    status = Column(String(20), default="ready", nullable=False)
     owner_id = Column(String(255), ForeignKey('users.id'))
 
     owner = relationship("User", back_populates="uploads")
@@ -47,7 +50,28 @@ class Payment(Base):
     song_id = Column(String(255), ForeignKey('songs.id'), nullable=False)
     tid = Column(String(255), nullable=False, unique=True)
     status = Column(String(20), default="READY")
-    created_at = Column(DateTime, default=datetime.datetime.now())
+    created_at = Column(DateTime, default=datetime.datetime.now)
 
     user = relationship("User")
-    song = relationship("Song")
\ No newline at end of file
+    song = relationship("Song")
+
+# 내용 해시로 저장된 미디어 파일과 이를 참조하는 곡 수
+class MediaBlob(Base):
+    __tablename__ = 'media_blobs'
+
+    key = Column(String(255), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+# 클라이언트 재생 이벤트 (분석용, 곡/사용자가 지워져도 남도록 외래 키를 두지 않는다)
+class PlayEvent(Base):
+    __tablename__ = 'play_events'
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    song_id = Column(String(255), nullable=False, index=True)
+    user_id = Column(String(255), nullable=True)
+    position = Column(Float, nullable=False)
+    listened = Column(Float, nullable=False)
+    played_at = Column(DateTime, nullable=False, index=True)
+    received_at = Column(DateTime, nullable=False)
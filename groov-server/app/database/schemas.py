@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional, Literal
 import datetime
 
@@ -16,15 +16,20 @@ class SongCreate(SongBase):
 class Song(SongBase):
     id: str
     image: str
+    image_key: Optional[str] = None
     file_url: str
     upload_date: datetime.datetime
     duration: float
     download_count: int
+    play_count: int = 0
     owner_id: str
+    status: str = "ready"
 
     class Config:
         from_attributes = True
 
+SongList = TypeAdapter(List[Song])
+
 
 # User schema
 
@@ -47,6 +52,18 @@ class User(UserBase):
         from_attributes = True
 
 
+class ProfileUser(BaseModel):
+    id: str
+    name: str
+    image: Optional[str] = None
+    createDate: str
+
+class Profile(BaseModel):
+    user: ProfileUser
+    uploads: List[Song] = []
+    nextCursor: Optional[str] = None
+
+
 # Payment schema
 
 class Payment(BaseModel):
@@ -68,3 +85,15 @@ class PaymentApproveRequest(BaseModel):
     song_id: str
     tid: str
     pg_token: str
+
+
+# Play event schema
+
+class PlayEventIn(BaseModel):
+    song_id: str = Field(max_length=255)
+    position: float = Field(ge=0)  # 이 구간을 듣기 시작한 재생 위치(초)
+    listened: float = Field(ge=0)  # 이번 구간에서 실제로 들은 시간(초)
+    played_at: Optional[datetime.datetime] = None
+
+class PlayEventBatch(BaseModel):
+    events: List[PlayEventIn] = Field(min_length=1, max_length=500)
@@ -0,0 +1,46 @@
+from pathlib import Path
+from sqlalchemy.orm import Session
+
+from app.database.models import Song
+
+# 작업 결과를 DB 에 반영하는 핸들러 (메인 프로세스에서 실행)
+
+def apply_probe_audio(db: Session, payload: dict, result: dict):
+    song = db.query(Song).filter(Song.id == payload["song_id"]).first()
+    if not song:
+        return
+    song.duration = result["duration"]
+    song.status = "ready"
+    db.commit()
+
+def fail_song(db: Session, payload: dict, error: str):
+    song = db.query(Song).filter(Song.id == payload["song_id"]).first()
+    if not song:
+        return
+    song.status = "failed"
+    db.commit()
+
+# 작업 도중 이미지가 다시 바뀌었으면 결과를 버리고, 반영되면 이전 썸네일을 지운다.
+def apply_image_variants(db: Session, payload: dict, result: dict):
+    output = Path(payload["output_dir"])
+    image_key = result["image_key"]
+    song = db.query(Song).filter(Song.id == payload["song_id"]).first()
+    if not song or song.image != payload["image_url"]:
+        for path in output.glob(f"*_{image_key}.*"):
+            path.unlink(missing_ok=True)
+        return
+
+    song.image_key = image_key
+    db.commit()
+    for path in output.iterdir():
+        if f"_{image_key}." not in path.name:
+            path.unlink(missing_ok=True)
+
+RESULT_HANDLERS = {
+    "probe_audio": apply_probe_audio,
+    "image_variants": apply_image_variants,
+}
+
+FAILURE_HANDLERS = {
+    "probe_audio": fail_song,
+}
@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+# 외부 브로커 없이 동작하도록 SQLite 파일 하나를 작업 큐로 사용한다.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    result TEXT,
+    error TEXT,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_available ON jobs (status, available_at);
+"""
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    result: dict | None = None
+    error: str | None = None
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            id=row["id"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+        )
+
+class JobQueue:
+    def __init__(self, path: str | Path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # 첫 연결에서 만든다 (생성자는 파일을 건드리지 않는다).
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = 3, delay: float = 0) -> int:
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO jobs (kind, payload, max_attempts, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload), max_attempts, now + delay, now, now),
+        )
+        return cursor.lastrowid
+
+    # 여러 작업을 한 트랜잭션으로 넣는다. jobs: [(kind, payload), ...]
+    def enqueue_many(self, jobs: list[tuple[str, dict]], max_attempts: int = 3) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO jobs (kind, payload, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(kind, json.dumps(payload), max_attempts, now, now, now) for kind, payload in jobs],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # 여러 uvicorn 워커가 같은 작업을 가져가지 않도록 IMMEDIATE 트랜잭션 안에서 선점한다.
+    def claim(self, limit: int = 1) -> list[Job]:
+        if limit <= 0:
+            return []
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND available_at <= ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            for row in rows:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        jobs = []
+        for row in rows:
+            job = Job.from_row(row)
+            job.status = "running"
+            job.attempts += 1
+            jobs.append(job)
+        return jobs
+
+    def complete(self, job_id: int, result: dict | None = None):
+        self._connect().execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+            (json.dumps(result) if result is not None else None, time.time(), job_id),
+        )
+
+    # 재시도 가능하면 지연 후 다시 대기열에 넣고 True, 최종 실패면 False 를 반환한다.
+    def fail(self, job: Job, error: str, retry_delay: float = 5) -> bool:
+        now = time.time()
+        retry = job.attempts < job.max_attempts
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+            ("queued" if retry else "failed", error, now + retry_delay * job.attempts, now, job.id),
+        )
+        return retry
+
+    def get(self, job_id: int) -> Job | None:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    # 워커 프로세스가 죽어 running 상태로 남은 작업을 되살린다.
+    def requeue_stale(self, timeout: float) -> int:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'queued', available_at = ?, updated_at = ? "
+            "WHERE status = 'running' AND updated_at < ?",
+            (now, now, now - timeout),
+        )
+        return cursor.rowcount
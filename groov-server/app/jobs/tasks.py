@@ -0,0 +1,120 @@
+import inspect
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+from app.utils.images import IMAGE_VARIANT_SIZES, IMAGE_VARIANT_QUALITY, variant_filename
+from app.utils.waveform import WAVEFORM_SAMPLE_RATE, encode_waveform
+
+# 프로세스 풀에서 실행되는 작업들. 인자와 반환값은 pickle 가능한 기본 타입만 사용한다.
+
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", 6))
+HLS_BITRATES = [int(rate) for rate in os.getenv("HLS_BITRATES", "64,128,256").split(",") if rate.strip()]
+
+def probe_audio(song_id: str, audio_path: str) -> dict:
+    from mutagen.mp3 import MP3
+
+    audio = MP3(audio_path)
+    return {"duration": audio.info.length}
+
+# 비트레이트별 AAC 세그먼트와 variant playlist 를 만들고 master playlist 로 묶는다.
+def segment_hls(song_id: str, audio_path: str, output_dir: str) -> dict:
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return {"hls": False}
+
+    output = Path(output_dir)
+    staging = output.with_name(output.name + ".part")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    try:
+        master = ["#EXTM3U", "#EXT-X-VERSION:3"]
+        for bitrate in HLS_BITRATES:
+            variant_dir = staging / f"{bitrate}k"
+            variant_dir.mkdir()
+            subprocess.run(
+                [
+                    ffmpeg, "-nostdin", "-loglevel", "error", "-y",
+                    "-i", audio_path,
+                    "-vn", "-c:a", "aac", "-b:a", f"{bitrate}k",
+                    "-f", "hls",
+                    "-hls_time", str(HLS_SEGMENT_SECONDS),
+                    "-hls_playlist_type", "vod",
+                    "-hls_segment_filename", str(variant_dir / "segment_%04d.ts"),
+                    str(variant_dir / "index.m3u8"),
+                ],
+                check=True,
+                capture_output=True,
+            )
+            master.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bitrate * 1000},CODECS="mp4a.40.2"')
+            master.append(f"{bitrate}k/index.m3u8")
+        (staging / "master.m3u8").write_text("\n".join(master) + "\n")
+
+        shutil.rmtree(output, ignore_errors=True)
+        os.replace(staging, output)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return {"hls": True, "bitrates": HLS_BITRATES}
+
+# 커버 이미지를 정사각형으로 잘라 크기별 WebP 썸네일을 만든다.
+def image_variants(song_id: str, image_path: str, image_url: str, output_dir: str, image_key: str) -> dict:
+    from PIL import Image, ImageOps
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    with Image.open(image_path) as source:
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        for size in IMAGE_VARIANT_SIZES:
+            variant = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            target = output / variant_filename(size, image_key)
+            partial = target.with_name(target.name + ".part")
+            variant.save(partial, "WEBP", quality=IMAGE_VARIANT_QUALITY, method=4)
+            os.replace(partial, target)
+
+    return {"image_key": image_key, "sizes": IMAGE_VARIANT_SIZES}
+
+# 음원을 한 번 디코딩해 여러 해상도의 min/max 피크를 계산해 둔다.
+def waveform_peaks(song_id: str, audio_path: str, output_path: str) -> dict:
+    import numpy as np
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return {"waveform": False}
+
+    decoded = subprocess.run(
+        [
+            ffmpeg, "-nostdin", "-loglevel", "error",
+            "-i", audio_path,
+            "-vn", "-ac", "1", "-ar", str(WAVEFORM_SAMPLE_RATE),
+            "-f", "s16le", "-",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    samples = np.frombuffer(decoded.stdout, dtype="<i2")
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    partial = output.with_name(output.name + ".part")
+    partial.write_bytes(encode_waveform(samples))
+    os.replace(partial, output)
+    return {"waveform": True}
+
+TASKS = {
+    "probe_audio": probe_audio,
+    "segment_hls": segment_hls,
+    "image_variants": image_variants,
+    "waveform_peaks": waveform_peaks,
+}
+
+# payload 에는 결과 핸들러용 값(owner_id 등)도 들어 있으므로 작업이 받는 인자만 넘긴다.
+def run_task(kind: str, payload: dict) -> dict:
+    task = TASKS[kind]
+    parameters = inspect.signature(task).parameters
+    return task(**{name: value for name, value in payload.items() if name in parameters})
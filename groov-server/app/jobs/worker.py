@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from starlette.concurrency import run_in_threadpool
+
+from app.database.database import SessionLocal
+from app.jobs.handlers import RESULT_HANDLERS, FAILURE_HANDLERS
+from app.jobs.queue import Job, JobQueue
+from app.jobs.tasks import run_task
+
+logger = logging.getLogger(__name__)
+
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", 2))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 0.5))
+JOB_STALE_TIMEOUT = float(os.getenv("JOB_STALE_TIMEOUT", 600))
+# fork 는 스레드풀 스레드와 열린 DB 연결을 가진 프로세스를 그대로 복제해 잡혀 있던 잠금까지 물려받을 수 있다.
+# 작업 함수(app.jobs.tasks)는 앱 상태 없이 import 되므로 새 인터프리터(spawn)로 띄운다.
+MEDIA_WORKER_START_METHOD = os.getenv("MEDIA_WORKER_START_METHOD", "spawn")
+
+class JobWorker:
+    def __init__(self, queue: JobQueue, max_workers: int = MEDIA_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.listeners = []
+        self._pool: ProcessPoolExecutor | None = None
+        self._loop_task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def start(self):
+        if self._loop_task is not None:
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context(MEDIA_WORKER_START_METHOD)
+        )
+        await run_in_threadpool(self.queue.requeue_stale, JOB_STALE_TIMEOUT)
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._loop_task is None:
+            return
+        self._loop_task.cancel()
+        try:
+            await self._loop_task
+        except asyncio.CancelledError:
+            pass
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        self._pool.shutdown(wait=True)
+        self._loop_task = None
+        self._pool = None
+
+    async def _run(self):
+        while True:
+            try:
+                jobs = await run_in_threadpool(self.queue.claim, self.max_workers - len(self._running))
+            except Exception:
+                logger.exception("job claim failed")
+                jobs = []
+
+            for job in jobs:
+                task = asyncio.create_task(self._execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            if not jobs:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _execute(self, job: Job):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._pool, run_task, job.kind, job.payload)
+            await run_in_threadpool(self._apply, RESULT_HANDLERS.get(job.kind), job.payload, result)
+            await run_in_threadpool(self.queue.complete, job.id, result)
+            self._emit(job, "done", result)
+        except Exception as e:
+            logger.warning("job %s (%s) failed: %s", job.id, job.kind, e)
+            retry = await run_in_threadpool(self.queue.fail, job, str(e))
+            if not retry:
+                await run_in_threadpool(self._apply, FAILURE_HANDLERS.get(job.kind), job.payload, str(e))
+                self._emit(job, "failed", None)
+        finally:
+            self._wakeup.set()
+
+    def _apply(self, handler, payload: dict, value):
+        if handler is None:
+            return
+        db = SessionLocal()
+        try:
+            handler(db, payload, value)
+        finally:
+            db.close()
+
+    def _emit(self, job: Job, status: str, result: dict | None):
+        for listener in self.listeners:
+            try:
+                listener(job, status, result)
+            except Exception:
+                logger.exception("job listener failed")
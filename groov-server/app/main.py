@@ -1,69 +1,171 @@
-import os
+import asyncio
+import time
 import uuid
-import requests
+import shutil
 import urllib.parse
+from contextlib import AsyncExitStack, asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, Request, Response, APIRouter, Query
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Path as FastAPIPath
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timedelta, timezone
-from jose import jwt, JWTError
 from pathlib import Path
-from dotenv import load_dotenv
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-from sqlalchemy import delete
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from mutagen.mp3 import MP3
 
+from app.auth.cache import Principal, principal_cache
+from app.analytics.counters import counters
+from app.analytics.play_events import play_events, play_starts
+from app.analytics.trending import trending, CHART_HALF_LIVES
+from app.analytics.recommendations import recommendations, RECOMMEND_TOP_K
+from app.auth.google_auth import google_verifier
+from app.auth.token import create_access_token, create_refresh_token, verify_token, verify_claims, optional_user_id, decode_token, optional_oauth2_scheme, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.database.models import User, Song, Payment, user_downloads
-from app.database.schemas import User as UserSchema, Song as SongSchema, PaymentRequest, PaymentApproveRequest
-from app.database.database import engine, Base, get_db
-
-app = FastAPI()
-
-load_dotenv()
-
-# CORS 설정
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 구글 로그인 환경 변수
-GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
-
-# JWT 환경 변수
-JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
-JWT_REFRESH_SECRET_KEY = os.getenv("JWT_REFRESH_SECRET_KEY")
-JWT_ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
-REFRESH_TOKEN_EXPIRE_DAYS = 7
-
-# 카카오페이 환경 변수
-CID = os.getenv("CID")
-KAKAO_DEV_KEY = os.getenv("KAKAO_DEV_KEY")
-REDIRECT_BASE_URL = os.getenv("REDIRECT_BASE_URL")
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-Base.metadata.create_all(bind=engine)
-
-BASE_DIR = Path(__file__).resolve().parent
-MEDIA_DIR = BASE_DIR / "media"
-AUDIO_DIR = MEDIA_DIR / "audio"
-IMAGE_DIR = MEDIA_DIR / "image"
-AUDIO_DIR.mkdir(parents=True, exist_ok=True)
-IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+from app.database.schemas import User as UserSchema, Song as SongSchema, SongList, Profile as ProfileSchema, ProfileUser, PaymentRequest, PaymentApproveRequest, PlayEventBatch
+from app.database.database import configure_database, current_engine, async_session, current_async_engine, get_db, get_async_db
+from app.utils.pagination import parse_fields, song_columns, song_schema_columns, keyset_filter, keyset_order, encode_cursor, page_rows, serialize_song_row
+from app.search.index import search_index
+from app.search.sync import SearchIndexSync
+from app.payment.entitlements import entitlements, ENTITLEMENT_BATCH_LIMIT
+from app.payment.gateway import payment_gateway, GatewayError, GatewayUnavailable
+from app.storage.media_store import media_store, create_backend
+from app.notifications.broker import broker, sse_stream, SQLiteBroker, user_topic, SubscriberLimitReached, UPLOADS_TOPIC
+from app.maintenance.gc import GarbageCollector
+from app.jobs.queue import JobQueue
+from app.jobs.worker import JobWorker
+from app.utils.images import thumbnail_urls, IMMUTABLE_CACHE_CONTROL
+from app.utils.waveform import read_level
+from app.utils.upload import StagedFile, StagingRoute, UploadSizeLimitMiddleware, stage_upload, looks_like_mp3, MAX_AUDIO_SIZE, MAX_IMAGE_SIZE, BATCH_UPLOAD_MAX_TRACKS
+from app.utils.streaming import ranged_file_response
+from app.utils.http_cache import render_json, body_etag, validator_headers
+from app.utils.metrics import metrics, current_request, RequestStats, pool_gauges, log_slow_request
+from app.utils.response_cache import response_cache, cached_response
+from app.settings import Settings
+
+router = APIRouter(route_class=StagingRoute)
+
+# 처리 완료로 목록에 노출되는 곡이 바뀌므로 카탈로그 캐시를 비운다.
+def invalidate_on_job(job, status, result):
+    if job.kind in ("probe_audio", "image_variants"):
+        response_cache.invalidate("catalog", f"profile:{job.payload.get('owner_id')}")
+
+# 업로더에게 처리 단계별 상태를, 메타데이터 추출이 끝나 목록에 노출되면 모두에게 새 업로드를 알린다.
+def notify_on_job(job, status, result):
+    owner_id = job.payload.get("owner_id")
+    song_id = job.payload.get("song_id")
+    if owner_id:
+        broker.publish(user_topic(owner_id), "processing", {"song_id": song_id, "job": job.kind, "status": status})
+    if job.kind == "probe_audio" and status == "done":
+        broker.publish(UPLOADS_TOPIC, "upload", {"song_id": song_id, "owner_id": owner_id})
+
+# 앱마다 설정과 작업 큐/워커/GC 를 app.state 에 둔다. import 시점에는 파일, DB, 네트워크를 건드리지 않는다.
+def configure(state, app_settings: Settings):
+    state.settings = app_settings
+    media_store.backend = create_backend(root=app_settings.media_root)
+    trending.path = str(app_settings.trending_path)
+    recommendations.path = app_settings.recommend_path
+    if isinstance(broker, SQLiteBroker):
+        broker.path = str(app_settings.event_broker_path)
+    state.job_queue = JobQueue(app_settings.job_queue_path)
+    state.job_worker = JobWorker(state.job_queue)
+    state.job_worker.listeners.append(invalidate_on_job)
+    state.job_worker.listeners.append(notify_on_job)
+    state.media_gc = GarbageCollector(
+        media_store, [app_settings.hls_dir, app_settings.thumb_dir], app_settings.waveform_dir, app_settings.upload_tmp_dir
+    )
 
-app.mount("/media", StaticFiles(directory=MEDIA_DIR), name="media")
+def get_settings(request: Request) -> Settings:
+    return request.app.state.settings
+
+def get_job_queue(request: Request) -> JobQueue:
+    return request.app.state.job_queue
+
+def get_job_worker(request: Request) -> JobWorker:
+    return request.app.state.job_worker
+
+def get_media_gc(request: Request) -> GarbageCollector:
+    return request.app.state.media_gc
+
+# 스키마 생성은 python -m app.migrate 로 분리했다. CREATE_SCHEMA 는 로컬 개발용.
+def prepare_runtime(settings: Settings):
+    configure_database(settings.database_url)
+    if settings.create_schema:
+        from app.migrate import migrate
+
+        migrate(settings.database_url)
+    data_paths = (settings.job_queue_path, settings.trending_path, settings.recommend_path, settings.event_broker_path)
+    for directory in {settings.media_root, settings.upload_tmp_dir, *(path.parent for path in data_paths)}:
+        directory.mkdir(parents=True, exist_ok=True)
+
+# 검색 색인 초기화 / 다른 워커의 변경 반영
+search_sync = SearchIndexSync(search_index)
+
+# 백그라운드 루프는 등록 순서대로 시작하고 종료 시 역순으로 멈춘다.
+# background_tasks 가 꺼져 있으면 작업 워커, GC, 차트, 추천 갱신은 띄우지 않는다.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    state = app.state
+    prepare_runtime(state.settings)
+    background = state.settings.background_tasks
+    services = [
+        state.job_worker if background else None,  # 미디어 처리 워커
+        metrics,  # 이벤트 루프 지연 측정
+        counters,  # 다운로드/재생 카운터 flush
+        broker,  # 실시간 알림 브로커
+        play_events,  # 재생 이벤트 일괄 기록
+        state.media_gc if background else None,  # 고아 미디어 파일 정리 / 방치된 결제 만료
+        trending if background else None,  # 인기 차트 flush
+        recommendations if background else None,  # 함께 구매한 곡 추천 갱신
+        google_verifier,  # 구글 인증서 캐시
+        search_sync,
+    ]
+    async with AsyncExitStack() as stack:
+        stack.push_async_callback(payment_gateway.close)
+        for service in services:
+            if service is not None:
+                await service.start()
+                stack.push_async_callback(service.stop)
+        yield
+
+metrics.register_gauges(lambda: pool_gauges(current_engine(), "sync")() if current_engine() else [])
+metrics.register_gauges(lambda: pool_gauges(current_async_engine(), "async")() if current_async_engine() else [])
+metrics.register_gauges(lambda: [
+    ("groov_auth_cache_hits_total", {}, principal_cache.hits),
+    ("groov_auth_cache_misses_total", {}, principal_cache.misses),
+    ("groov_response_cache_hits_total", {"kind": "fresh"}, response_cache.hits),
+    ("groov_response_cache_hits_total", {"kind": "stale"}, response_cache.stale_hits),
+    ("groov_response_cache_misses_total", {}, response_cache.misses),
+    ("groov_play_events_total", {"result": "accepted"}, play_events.accepted),
+    ("groov_play_events_total", {"result": "rejected"}, play_events.rejected),
+    ("groov_play_events_written_total", {}, play_events.written),
+    ("groov_play_events_pending", {}, play_events.pending()),
+    ("groov_event_subscribers", {}, broker.subscribers),
+    ("groov_events_published_total", {}, broker.published),
+    ("groov_events_dropped_total", {}, broker.dropped),
+])
+
+# 요청별 지연/SQL 수집 (가장 먼저 등록해 security headers 미들웨어 안쪽에서 동작)
+async def collect_metrics(request: Request, call_next):
+    stats = RequestStats()
+    token = current_request.set(stats)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        current_request.reset(token)
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        metrics.observe_request(request.method, route_path, status_code, elapsed, stats)
+        log_slow_request(request.method, route_path, status_code, elapsed, stats)
 
-@app.middleware("http")
 async def add_security_headers(request: Request, call_next):
     response = await call_next(request)
     response.headers["Access-Control-Allow-Origin"] = "*"
@@ -74,73 +176,43 @@ async def add_security_headers(request: Request, call_next):
     response.headers['Cross-Origin-Embedder-Policy'] = 'require-corp'
     return response
 
-def create_access_token(data: dict, expires_delta: timedelta | None = None):
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-    return encoded_jwt
-
-def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_REFRESH_SECRET_KEY, algorithm=JWT_ALGORITHM)
-    return encoded_jwt
-
-def verify_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-
-        if user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-
-        user = db.query(User).filter(User.id == user_id).first()
-        if user is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-        return user
-
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+# 동기 세션 작업은 이벤트 루프를 막지 않도록 스레드풀에서 실행한다.
+def get_or_create_user(db: Session, user_data: dict):
+    user = db.query(User).filter(User.email == user_data["email"]).first()
+    if not user:
+        new_user = User(
+            id=user_data["id"],
+            name=user_data["name"],
+            image=user_data["image"],
+            email=user_data["email"],
+            created_at=datetime.now()
+        )
+        try:
+            db.add(new_user)
+            db.commit()
+            db.refresh(new_user)
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"DB Error: {str(e)}")
 
 # 구글 로그인
-@app.post("/user")
+@router.post("/user")
 async def google_auth(request: Request, response: Response, db: Session = Depends(get_db)):
     try:
         data = await request.json()
         token = data.get("token")
-        id_info = id_token.verify_oauth2_token(
-            token,
-            google_requests.Request(), GOOGLE_CLIENT_ID, clock_skew_in_seconds=10
-        )
+        id_info = await google_verifier.verify(token)
         user_data = {
             "id": id_info["sub"],
             "name": id_info["name"],
             "email": id_info["email"],
             "image": id_info["picture"],
         }
-        user = db.query(User).filter(User.email == user_data["email"]).first()
-        if not user:
-            new_user = User(
-                id=user_data["id"],
-                name=user_data["name"],
-                image=user_data["image"],
-                email=user_data["email"],
-                created_at=datetime.now()
-            )
-            try:
-                db.add(new_user)
-                db.commit()
-                db.refresh(new_user)
-            except Exception as e:
-                db.rollback()
-                raise HTTPException(status_code=500, detail=f"DB Error: {str(e)}")
+        await run_in_threadpool(get_or_create_user, db, user_data)
 
         current_time = datetime.now(timezone.utc)
         access_token = create_access_token(
-            data={"sub": user_data["id"]},
+            data={"sub": user_data["id"], "name": user_data["name"]},
             expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         )
         refresh_token = create_refresh_token(
@@ -170,75 +242,148 @@ async def google_auth(request: Request, response: Response, db: Session = Depend
         raise HTTPException(status_code=500, detail=f"Server Error: {e}")
 
 # 유저 업로드 리스트 조회
-@app.get("/profile")
-async def get_user_profile(user: User = Depends(verify_token), db: Session = Depends(get_db)):
-    user_data = db.query(User).filter(User.id == user.id).first()
-    if not user_data:
-        raise HTTPException(status_code=404, detail="User not found")
-    user_uploads = db.query(Song).filter(Song.owner_id == user.id).all()
-
-    return {
-        "user": {
-            "id": user_data.id,
-            "name": user_data.name,
-            "image": user_data.image,
-            "createDate": user_data.created_at.strftime("%Y-%m-%d")
-        },
-        "uploads": user_uploads
-    }
+@router.get("/profile")
+async def get_user_profile(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=100),
+    cursor: str | None = Query(None),
+    user: Principal = Depends(verify_token),
+):
+    query = select(*song_schema_columns()).where(Song.owner_id == user.id).order_by(*keyset_order())
+    if cursor:
+        query = query.where(keyset_filter(cursor))
+    if limit:
+        query = query.limit(limit + 1)
+
+    async def render():
+        async with async_session() as db:
+            rows = (await db.execute(query)).all()
+        rows, next_cursor = page_rows(rows, limit)
+
+        profile = ProfileSchema(
+            user=ProfileUser(
+                id=user.id,
+                name=user.name,
+                image=user.image,
+                createDate=user.created_at.strftime("%Y-%m-%d"),
+            ),
+            uploads=SongList.validate_python(rows, from_attributes=True),
+            nextCursor=next_cursor,
+        )
+        body = profile.model_dump_json().encode()
+        return body, {"ETag": body_etag(body), "Cache-Control": "private, no-cache"}
+
+    entry = await response_cache.get_or_compute(
+        response_cache.key_for(request, scope=user.id), (f"profile:{user.id}",), render
+    )
+    return cached_response(request, entry)
+
+# Prometheus 지표
+@router.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# 인증 캐시 통계
+@router.get("/stats/auth-cache")
+async def get_auth_cache_stats():
+    return principal_cache.stats()
+
+# 응답 캐시 통계
+@router.get("/stats/response-cache")
+async def get_response_cache_stats():
+    return response_cache.stats()
+
+# 마지막 정리 작업 결과
+@router.get("/stats/gc")
+async def get_gc_stats(media_gc: GarbageCollector = Depends(get_media_gc)):
+    return media_gc.last_report or {}
 
 # 유저 탈퇴
-@app.delete("/delete")
-async def delete_user(user: User = Depends(verify_token), db: Session = Depends(get_db)):
-    try:
+@router.delete("/delete")
+async def delete_user(user: Principal = Depends(verify_token), db: Session = Depends(get_db)):
+    def remove_user() -> tuple[list[str], list[str]]:
         db_user = db.query(User).filter(User.id == user.id).first()
         if not db_user:
             raise HTTPException(status_code=404, detail="User not found")
+        songs = db.query(Song.id, Song.file_url, Song.image).filter(Song.owner_id == user.id).all()
+        song_ids = [song.id for song in songs]
+        media_urls = [url for song in songs for url in (song.file_url, song.image)]
+        for url in media_urls:
+            media_store.release(db, url)
         db.query(Song).filter(Song.owner_id == user.id).delete()
         db.delete(db_user)
         db.commit()
+        media_store.collect(db, media_urls)
+        return song_ids, media_urls
+
+    try:
+        song_ids, media_urls = await run_in_threadpool(remove_user)
+        principal_cache.invalidate(user.id)
+        invalidate_catalog(user.id)
+        entitlements.invalidate_user(user.id)
+
+        counters.discard(song_ids)
+        for song_id in song_ids:
+            search_index.remove(song_id)
+            entitlements.revoke_song(song_id)
+            await run_in_threadpool(trending.remove, song_id)
 
         return {"message": "User deleted successfully."}
 
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         raise HTTPException(status_code=500, detail=f"Server Error: {str(e)}")
 
 # 전체 음원 데이터 조회
-@app.get("/songs")
-async def get_songs(db: Session = Depends(get_db)):
-    songs = db.query(Song).all()
-    db_songs = []
-    for song in songs:
-        db_songs.append({
-            "id": song.id,
-            "title": song.title,
-            "image": f"{song.image}",
-            "fileUrl": f"{song.file_url}",
-            "description": song.description,
-            "duration": song.duration,
-            "uploadDate": song.upload_date.strftime("%Y-%m-%d"),
-            "downloadCount": song.download_count,
+@router.get("/songs")
+async def get_songs(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=100),
+    cursor: str | None = Query(None),
+    fields: str | None = Query(None),
+):
+    selected = parse_fields(fields)
+    query = select(*song_columns(selected)).where(Song.status == "ready").order_by(*keyset_order())
+    if cursor:
+        query = query.where(keyset_filter(cursor))
+    if limit:
+        query = query.limit(limit + 1)
+
+    async def render():
+        async with async_session() as db:
+            rows = (await db.execute(query)).all()
+
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].uploadDate, rows[-1].id)
+
+        body = render_json({
+            "data": [serialize_song_row(row, selected) for row in rows],
+            "nextCursor": next_cursor,
         })
+        # 삭제·카운터 변경은 uploadDate 에 반영되지 않으므로 Last-Modified 없이 ETag 로만 검증한다.
+        return body, validator_headers(body_etag(body))
 
-    return {"data": db_songs}
+    entry = await response_cache.get_or_compute(response_cache.key_for(request), ("catalog",), render)
+    return cached_response(request, entry)
 
 # 음원 검색
-@app.get("/song")
+@router.get("/song")
 async def search_songs(
+    request: Request,
     search: str = Query(None, min_length=1, max_length=50),
-    db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=100),
 ):
-    try:
-        if search:
-            results = (
-                db.query(Song)
-                .filter(Song.title.ilike(f"%{search}%"))
-                .all()
-            )
-        else:
-            results = db.query(Song).all()
-        if not results: return {"data": []}
+    async def render():
+        async with async_session() as db:
+            if search:
+                song_ids = await run_in_threadpool(search_index.search, search, limit)
+                found = await db.execute(select(Song).where(Song.id.in_(song_ids), Song.status == "ready")) if song_ids else None
+                rows = {song.id: song for song in found.scalars().all()} if found else {}
+                results = [rows[song_id] for song_id in song_ids if song_id in rows]
+            else:
+                results = (await db.execute(select(Song).where(Song.status == "ready"))).scalars().all()
 
         songs = [
             {
@@ -249,157 +394,453 @@ async def search_songs(
                 "duration": song.duration,
                 "uploadDate": song.upload_date.strftime("%Y-%m-%d"),
                 "downloadCount": song.download_count,
+                "thumbnails": thumbnail_urls(song.id, song.image_key),
                 #"fileUrl": song.file_url,
             }
             for song in results
         ]
+        body = render_json({"data": songs})
+        return body, {"ETag": body_etag(body), "Cache-Control": "public, max-age=0, must-revalidate"}
 
-        return {"data": songs}
+    try:
+        entry = await response_cache.get_or_compute(response_cache.key_for(request), ("catalog",), render)
+        return cached_response(request, entry)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
 
+def invalidate_catalog(owner_id: str | None = None):
+    response_cache.invalidate("catalog", *([f"profile:{owner_id}"] if owner_id else []))
+
+def image_variants_job(settings: Settings, song: Song, image_path: Path, image_hash: str) -> tuple[str, dict]:
+    return "image_variants", {
+        "song_id": song.id,
+        "image_path": str(image_path),
+        "image_url": song.image,
+        "output_dir": str(settings.thumb_dir / song.id),
+        "image_key": image_hash[:16],
+        "owner_id": song.owner_id,
+    }
+
+# 새 음원의 메타데이터 추출, HLS 분할, 파형, 썸네일 작업
+def song_processing_jobs(settings: Settings, song: Song, audio_path: Path, image_path: Path, image_hash: str) -> list[tuple[str, dict]]:
+    return [
+        ("probe_audio", {"song_id": song.id, "audio_path": str(audio_path), "owner_id": song.owner_id}),
+        ("segment_hls", {"song_id": song.id, "audio_path": str(audio_path), "output_dir": str(settings.hls_dir / song.id), "owner_id": song.owner_id}),
+        ("waveform_peaks", {"song_id": song.id, "audio_path": str(audio_path), "output_path": str(settings.waveform_dir / f"{song.id}.bin"), "owner_id": song.owner_id}),
+        image_variants_job(settings, song, image_path, image_hash),
+    ]
+
 # 음원 파일 업로드
-@app.post("/upload", status_code=status.HTTP_201_CREATED)
+@router.post("/upload", status_code=status.HTTP_201_CREATED)
 async def upload_song(
     title: str = Form(...),
     audio_file: UploadFile = File(...),
     image_file: UploadFile = File(...),
-    user: User = Depends(verify_token),
+    user: Principal = Depends(verify_token),
     db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings),
+    job_queue: JobQueue = Depends(get_job_queue),
+    job_worker: JobWorker = Depends(get_job_worker),
 ):
+    staged = []
     try:
-        file_ext = os.path.splitext(audio_file.filename)[1]
-        image_ext = os.path.splitext(image_file.filename)[1]
         unique_id = str(uuid.uuid4().hex)[:8]
 
-        audio_filename = f"{title}_{unique_id}{file_ext}"
-        image_filename = f"{title}_{unique_id}{image_ext}"
-        audio_path = AUDIO_DIR / audio_filename
-        image_path = IMAGE_DIR / image_filename
-
-        with audio_path.open("wb") as buffer:
-            buffer.write(await audio_file.read())
-        with image_path.open("wb") as buffer:
-            buffer.write(await image_file.read())
+        staged_audio = await stage_upload(audio_file, settings.upload_tmp_dir, MAX_AUDIO_SIZE)
+        staged.append(staged_audio)
+        staged_image = await stage_upload(image_file, settings.upload_tmp_dir, MAX_IMAGE_SIZE)
+        staged.append(staged_image)
 
-        try:
-            audio = MP3(str(audio_path))
-            duration = audio.info.length
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"MP3 처리 오류: {str(e)}")
+        if not await looks_like_mp3(staged_audio):
+            raise HTTPException(status_code=400, detail="MP3 처리 오류: 올바른 MP3 파일이 아닙니다.")
 
         new_song = Song(
             id=unique_id,
             title=title,
-            image=f"/media/image/{image_filename}",
-            file_url=f"/media/audio/{audio_filename}",
             upload_date=datetime.now(),
-            duration=duration,
+            duration=0,
             download_count=0,
             description=user.name,
             owner_id=user.id,
+            status="processing",
         )
-        db.add(new_song)
-        db.commit()
-        db.refresh(new_song)
+        def save():
+            new_song.file_url = media_store.url_for(media_store.add(db, "audio", staged_audio, audio_file.filename))
+            new_song.image = media_store.url_for(media_store.add(db, "image", staged_image, image_file.filename))
+            db.add(new_song)
+            db.commit()
+            db.refresh(new_song)
+
+        await run_in_threadpool(save)
+        audio_path = media_store.local_path(new_song.file_url)
+        image_path = media_store.local_path(new_song.image)
+        search_index.add(new_song.id, new_song.title, new_song.description)
+        invalidate_catalog(user.id)
+
+        await run_in_threadpool(job_queue.enqueue_many, song_processing_jobs(settings, new_song, audio_path, image_path, staged_image.sha256))
+        job_worker.notify()
+
+        return {"song_id": new_song.id, "status": new_song.status}
+
+    except HTTPException:
+        for staged_file in staged: staged_file.discard()
+        raise
+    except Exception as e:
+        for staged_file in staged: staged_file.discard()
+        raise HTTPException(status_code=500, detail=f"업로드 실패: {str(e)}")
+    
+async def stage_track(audio_file: UploadFile, tmp_dir: Path) -> StagedFile:
+    staged_audio = await stage_upload(audio_file, tmp_dir, MAX_AUDIO_SIZE)
+    if not await looks_like_mp3(staged_audio):
+        staged_audio.discard()
+        raise HTTPException(status_code=400, detail=f"MP3 처리 오류: 올바른 MP3 파일이 아닙니다: {audio_file.filename}")
+    return staged_audio
+
+# 앨범 단위 업로드: 커버는 하나(공유) 또는 트랙마다 하나. 트랙별 실패는 응답의 items 에 담고 나머지는 등록한다.
+@router.post("/upload/batch", status_code=status.HTTP_201_CREATED)
+async def upload_batch(
+    titles: list[str] = Form(...),
+    audio_files: list[UploadFile] = File(...),
+    image_files: list[UploadFile] = File(...),
+    user: Principal = Depends(verify_token),
+    db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings),
+    job_queue: JobQueue = Depends(get_job_queue),
+    job_worker: JobWorker = Depends(get_job_worker),
+):
+    if len(audio_files) > BATCH_UPLOAD_MAX_TRACKS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {BATCH_UPLOAD_MAX_TRACKS}곡까지 업로드할 수 있습니다.")
+    if len(titles) != len(audio_files):
+        raise HTTPException(status_code=400, detail="titles 와 audio_files 의 개수가 다릅니다.")
+    if len(image_files) not in (1, len(audio_files)):
+        raise HTTPException(status_code=400, detail="image_files 는 1개 또는 트랙 수만큼이어야 합니다.")
+
+    staged_audio, staged_images = await asyncio.gather(
+        asyncio.gather(*(stage_track(audio_file, settings.upload_tmp_dir) for audio_file in audio_files), return_exceptions=True),
+        asyncio.gather(*(stage_upload(image_file, settings.upload_tmp_dir, MAX_IMAGE_SIZE) for image_file in image_files), return_exceptions=True),
+    )
+    staged = [result for result in (*staged_audio, *staged_images) if isinstance(result, StagedFile)]
+
+    def discard_all():
+        for staged_file in staged: staged_file.discard()
+
+    unexpected = next(
+        (result for result in (*staged_audio, *staged_images) if isinstance(result, BaseException) and not isinstance(result, HTTPException)),
+        None,
+    )
+    if unexpected is not None:
+        discard_all()
+        raise HTTPException(status_code=500, detail=f"업로드 실패: {str(unexpected)}")
+    shared_cover = len(image_files) == 1
+    if shared_cover and isinstance(staged_images[0], HTTPException):
+        discard_all()
+        raise staged_images[0]
+
+    items = []
+    accepted = []
+    now = datetime.now()
+    for index, (title, audio_file) in enumerate(zip(titles, audio_files)):
+        image_index = 0 if shared_cover else index
+        audio, image = staged_audio[index], staged_images[image_index]
+        error = audio if isinstance(audio, HTTPException) else image if isinstance(image, HTTPException) else None
+        if error is not None:
+            if isinstance(audio, StagedFile): audio.discard()
+            items.append({"index": index, "title": title, "status": "failed", "detail": error.detail})
+            continue
+
+        song = Song(
+            id=str(uuid.uuid4().hex)[:8],
+            title=title,
+            # 최신순 목록에서 트랙 순서가 유지되도록 한다.
+            upload_date=now - timedelta(microseconds=index),
+            duration=0,
+            download_count=0,
+            description=user.name,
+            owner_id=user.id,
+            status="processing",
+        )
+        accepted.append((song, audio, audio_file.filename, image_index))
+        items.append({"index": index, "title": title, "song_id": song.id, "status": song.status})
 
-        return {"song_id": new_song.id}
+    used_images = {image_index for *_, image_index in accepted}
+    for image_index, image in enumerate(staged_images):
+        if isinstance(image, StagedFile) and image_index not in used_images:
+            image.discard()
 
+    try:
+        # 공유 커버는 blob 하나를 트랙 수만큼 참조한다 (두 번째부터는 이미 있는 blob 의 참조 수만 올린다).
+        def save():
+            for song, audio, filename, image_index in accepted:
+                song.file_url = media_store.url_for(media_store.add(db, "audio", audio, filename))
+                song.image = media_store.url_for(
+                    media_store.add(db, "image", staged_images[image_index], image_files[image_index].filename)
+                )
+            db.add_all([song for song, *_ in accepted])
+            db.commit()
+
+        await run_in_threadpool(save)
     except Exception as e:
+        await run_in_threadpool(db.rollback)
+        discard_all()
         raise HTTPException(status_code=500, detail=f"업로드 실패: {str(e)}")
-    
+
+    if accepted:
+        for song, *_ in accepted:
+            search_index.add(song.id, song.title, song.description)
+        invalidate_catalog(user.id)
+
+        jobs = []
+        for song, audio, _, image_index in accepted:
+            jobs += song_processing_jobs(
+                settings, song, media_store.local_path(song.file_url), media_store.local_path(song.image), staged_images[image_index].sha256
+            )
+        await run_in_threadpool(job_queue.enqueue_many, jobs)
+        job_worker.notify()
+
+    return {"items": items, "accepted": len(accepted), "failed": len(items) - len(accepted)}
+
+# 이 곡을 구매한 사용자들이 함께 구매한 곡
+@router.get("/song/{song_id}/similar")
+async def get_similar_songs(
+    song_id: str,
+    limit: int = Query(10, ge=1, le=RECOMMEND_TOP_K),
+    fields: str | None = Query(None),
+):
+    similar = recommendations.similar(song_id, limit)
+    selected = parse_fields(fields)
+    song_ids = [similar_id for similar_id, _ in similar]
+    async with async_session() as db:
+        rows = (await db.execute(
+            select(*song_columns(selected)).where(Song.id.in_(song_ids), Song.status == "ready")
+        )).all() if song_ids else []
+    songs = {row.id: serialize_song_row(row, selected) for row in rows}
+
+    data = [
+        {"songId": similar_id, "score": round(score, 4), "song": songs[similar_id]}
+        for similar_id, score in similar
+        if similar_id in songs
+    ]
+    return {"songId": song_id, "data": data}
+
+# 인기 차트 (daily / weekly / all-time)
+@router.get("/charts/{chart}")
+async def get_chart(
+    chart: str,
+    limit: int = Query(50, ge=1, le=100),
+    fields: str | None = Query(None),
+):
+    if chart not in CHART_HALF_LIVES:
+        raise HTTPException(status_code=404, detail="차트를 찾을 수 없습니다.")
+
+    entries = trending.chart(chart, limit)
+    selected = parse_fields(fields)
+    song_ids = [entry["songId"] for entry in entries]
+    async with async_session() as db:
+        rows = (await db.execute(
+            select(*song_columns(selected)).where(Song.id.in_(song_ids), Song.status == "ready")
+        )).all() if song_ids else []
+    songs = {row.id: serialize_song_row(row, selected) for row in rows}
+
+    data = [entry | {"song": songs[entry["songId"]]} for entry in entries if entry["songId"] in songs]
+    return {"chart": chart, "data": data}
+
+# 음원 처리 상태 조회
+@router.get("/song/{song_id}/status")
+async def get_song_status(song_id: str, db: AsyncSession = Depends(get_async_db)):
+    song = (await db.execute(select(Song.id, Song.status, Song.duration).where(Song.id == song_id))).first()
+    if not song:
+        raise HTTPException(status_code=404, detail="음원을 찾을 수 없습니다.")
+
+    return {"id": song.id, "status": song.status, "duration": song.duration}
+
+# 음원 스트리밍 (Range 요청 지원)
+@router.get("/stream/{song_id}")
+async def stream_song(song_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    song = (await db.execute(select(Song.file_url).where(Song.id == song_id))).first()
+    if not song:
+        raise HTTPException(status_code=404, detail="음원을 찾을 수 없습니다.")
+
+    return await ranged_file_response(
+        request,
+        media_store.local_path(song.file_url),
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+
+# 음원 재생 이벤트 (구버전 클라이언트용. 재생 횟수는 /events/play 배치에서도 세므로 둘 다 보내면 두 번 센다)
+@router.post("/song/{song_id}/play", status_code=status.HTTP_204_NO_CONTENT, deprecated=True)
+async def record_play(song_id: str = FastAPIPath(..., max_length=255)):
+    # 존재하지 않는 id 는 flush 시 UPDATE 대상이 없어 무시된다.
+    counters.record(song_id, "play_count")
+
+# 클라이언트가 모아 보낸 재생 구간 이벤트 (분석용, 버퍼에 쌓았다가 일괄 INSERT) 와 곡별 재생 횟수
+@router.post("/events/play", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_play_events(batch: PlayEventBatch, user_id: str | None = Depends(optional_user_id)):
+    if not play_events.record_many(batch.events, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="재생 이벤트가 밀려 있습니다. 잠시 후 다시 보내주세요.",
+            headers={"Retry-After": str(max(1, round(play_events.interval)))},
+        )
+    for song_id, plays in play_starts(batch.events).items():
+        counters.record(song_id, "play_count", plays)
+    return {"accepted": len(batch.events)}
+
+# 커버 썸네일 (파일명에 해시가 포함되어 있어 영구 캐시)
+@router.get("/images/{song_id}/{filename}")
+async def get_thumbnail(song_id: str, filename: str, settings: Settings = Depends(get_settings)):
+    path = settings.thumb_dir / Path(song_id).name / Path(filename).name
+    if not await run_in_threadpool(path.is_file):
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
+# 파형 피크 데이터 (level 지정 시 해당 해상도의 int8 min/max 쌍만 반환)
+@router.get("/song/{song_id}/waveform")
+async def get_waveform(
+    song_id: str,
+    request: Request,
+    level: int | None = Query(None, ge=0),
+    settings: Settings = Depends(get_settings),
+):
+    path = settings.waveform_dir / f"{Path(song_id).name}.bin"
+    if level is None:
+        return await ranged_file_response(
+            request, path, media_type="application/octet-stream",
+            headers={"Cache-Control": "public, max-age=86400"},
+        )
+
+    try:
+        data = await run_in_threadpool(path.read_bytes)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="파형 데이터가 아직 준비되지 않았습니다.")
+    try:
+        peaks, bins = read_level(data, level)
+    except IndexError:
+        raise HTTPException(status_code=400, detail="지원하지 않는 level 입니다.")
+
+    return Response(
+        content=peaks,
+        media_type="application/octet-stream",
+        headers={"Cache-Control": "public, max-age=86400", "X-Waveform-Bins": str(bins)},
+    )
+
+# HLS master playlist
+@router.get("/stream/{song_id}/playlist.m3u8")
+async def stream_playlist(song_id: str, settings: Settings = Depends(get_settings)):
+    playlist = settings.hls_dir / Path(song_id).name / "master.m3u8"
+    if not playlist.exists():
+        raise HTTPException(status_code=404, detail="스트리밍 준비 중입니다.")
+
+    return RedirectResponse(f"/media/hls/{Path(song_id).name}/master.m3u8")
+
 # 음원 파일 수정
-@app.put("/song/{song_id}")
+@router.put("/song/{song_id}")
 async def edit_song(
     song_id: str,
     title: str = Form(...),
     image_file: UploadFile = File(None),
     db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings),
+    job_queue: JobQueue = Depends(get_job_queue),
+    job_worker: JobWorker = Depends(get_job_worker),
 ):
-    song = db.query(Song).filter(Song.id == song_id).first()
+    song = await run_in_threadpool(lambda: db.query(Song).filter(Song.id == song_id).first())
     if not song:
         raise HTTPException(status_code=404, detail="음원을 찾을 수 없습니다.")
 
     song.title = title
+    old_image = None
     if image_file:
-        old_image_path = Path(song.image)
-        if old_image_path.exists(): os.remove(old_image_path)
-
-        image_ext = os.path.splitext(image_file.filename)[1]
-        unique_id = str(uuid.uuid4().hex)[:8]
-        image_filename = f"{title}_{unique_id}{image_ext}"
-        image_path = IMAGE_DIR / image_filename
-
-        with image_path.open("wb") as buffer:
-            buffer.write(await image_file.read())
-
-        song.image = f"/media/image/{image_filename}"
+        staged_image = await stage_upload(image_file, settings.upload_tmp_dir, MAX_IMAGE_SIZE)
+        old_image = song.image
+        song.image_key = None
+
+    def save():
+        if image_file:
+            song.image = media_store.url_for(media_store.add(db, "image", staged_image, image_file.filename))
+            media_store.release(db, old_image)
+        song.upload_date = datetime.now()
+        db.commit()
+        db.refresh(song)
+        if image_file:
+            media_store.collect(db, [old_image])
 
-    song.upload_date = datetime.now()
-    db.commit()
-    db.refresh(song)
+    await run_in_threadpool(save)
+    search_index.add(song.id, song.title, song.description)
+    invalidate_catalog(song.owner_id)
+    if image_file:
+        await run_in_threadpool(
+            job_queue.enqueue, *image_variants_job(settings, song, media_store.local_path(song.image), staged_image.sha256)
+        )
+        job_worker.notify()
 
     return {"song_id": song.id}
 
 # 음원 파일 삭제
-@app.delete("/song/{song_id}")
+@router.delete("/song/{song_id}")
 async def delete_song(
     song_id: str,
-    user: User = Depends(verify_token),
+    user: Principal = Depends(verify_token),
     db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings),
 ):
-    song = db.query(Song).filter(Song.id == song_id, Song.owner_id == user.id).first()
+    song = await run_in_threadpool(
+        lambda: db.query(Song).filter(Song.id == song_id, Song.owner_id == user.id).first()
+    )
     if not song:
         raise HTTPException(status_code=404, detail="노래를 찾을 수 없습니다.")
 
-    audio_path = AUDIO_DIR / Path(song.file_url).name
-    image_path = IMAGE_DIR / Path(song.image).name
-
-    if audio_path.exists(): os.remove(audio_path)
-    if image_path.exists(): os.remove(image_path)
-
-    db.execute(delete(user_downloads).where(user_downloads.c.song_id == song_id))
-
-    db.delete(song)
-    db.commit()
+    def remove():
+        db.execute(delete(user_downloads).where(user_downloads.c.song_id == song_id))
+        media_urls = [song.file_url, song.image]
+        for url in media_urls:
+            media_store.release(db, url)
+        db.delete(song)
+        db.commit()
+        media_store.collect(db, media_urls)
+
+    # 파생 산출물은 곡 삭제가 커밋된 뒤에 지운다. 실패하면 곡과 함께 남는다.
+    def remove_outputs():
+        shutil.rmtree(settings.hls_dir / song_id, True)
+        shutil.rmtree(settings.thumb_dir / song_id, True)
+        (settings.waveform_dir / f"{song_id}.bin").unlink(missing_ok=True)
+
+    await run_in_threadpool(remove)
+    await run_in_threadpool(remove_outputs)
+    search_index.remove(song_id)
+    entitlements.revoke_song(song_id)
+    counters.discard([song_id])
+    await run_in_threadpool(trending.remove, song_id)
+    invalidate_catalog(user.id)
 
     return {"detail": "음원이 삭제되었습니다."}
 
 # 카카오페이 결제 준비 요청
-@app.post("/payment/ready")
+@router.post("/payment/ready")
 async def payment_ready(
     request: PaymentRequest,
-    user: User = Depends(verify_token), 
-    db: Session = Depends(get_db)
+    user: Principal = Depends(verify_token), 
+    db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings),
 ):
-    headers = {
-        "Authorization": f"SECRET_KEY {KAKAO_DEV_KEY}",
-        "Content-Type": "application/json"
-    }
     data = {
-        "cid": CID,
+        "cid": settings.cid,
         "partner_order_id": request.order_id,
         "partner_user_id": user.id,
         "item_name": request.item_name,
         "quantity": "1",
         "total_amount": "200",
         "tax_free_amount": "0",
-        "approval_url": f"{REDIRECT_BASE_URL}/payment/success",
-        "cancel_url": f"{REDIRECT_BASE_URL}/payment/cancel",
-        "fail_url": f"{REDIRECT_BASE_URL}/payment/fail",
+        "approval_url": f"{settings.redirect_base_url}/payment/success",
+        "cancel_url": f"{settings.redirect_base_url}/payment/cancel",
+        "fail_url": f"{settings.redirect_base_url}/payment/fail",
     }
 
     try:
-        response = requests.post(
-            "https://open-api.kakaopay.com/online/v1/payment/ready",
-            headers=headers,
-            json=data,
-        )
-        result = response.json()
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail=result)
-        
+        result = await payment_gateway.ready(data)
+
         payment = Payment(
             order_id=request.order_id,
             user_id=user.id,
@@ -408,29 +849,60 @@ async def payment_ready(
             status="READY"
         )
         db.add(payment)
-        db.commit()
+        await run_in_threadpool(db.commit)
 
         return {
             "tid": result["tid"],
             "next_redirect_pc_url": result["next_redirect_pc_url"],
         }
 
+    except GatewayError as e:
+        raise HTTPException(status_code=400, detail=e.body)
+    except GatewayUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# 현재 상태를 조건으로 바꿔, 같은 결제에 동시에 들어온 승인 요청이 서로의 상태를 덮어쓰지 않게 한다.
+def transition_payment(db: Session, payment_id: int, from_statuses: tuple[str, ...], status: str) -> bool:
+    changed = db.execute(
+        update(Payment).where(Payment.id == payment_id, Payment.status.in_(from_statuses)).values(status=status)
+    ).rowcount
+    db.commit()
+    return bool(changed)
+
+# 구매한 곡을 다운로드 목록에 넣는다. (곡, 새로 추가됐는지) 를 반환한다.
+def grant_download(db: Session, user_id: str, song_id: str):
+    song = db.query(Song.id).filter(Song.id == song_id).first()
+    if not song:
+        return None, False
+
+    owned = (
+        db.query(user_downloads.c.song_id)
+        .filter(user_downloads.c.user_id == user_id, user_downloads.c.song_id == song.id)
+        .first()
+    )
+    if owned:
+        return song, False
+    try:
+        db.execute(insert(user_downloads).values(user_id=user_id, song_id=song.id))
+        db.commit()
+    except IntegrityError:
+        # 같은 결제의 다른 승인 요청이 먼저 넣었다.
+        db.rollback()
+        return song, False
+    return song, True
+
 # 카카오페이 결제 승인 요청
-@app.post("/payment/approve")
+@router.post("/payment/approve")
 async def payment_approve(
     request: PaymentApproveRequest, 
-    user: User = Depends(verify_token),
-    db: Session = Depends(get_db)
+    user: Principal = Depends(verify_token),
+    db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings),
 ):
-    headers = {
-        "Authorization": f"SECRET_KEY {KAKAO_DEV_KEY}",
-        "Content-Type": "application/json"
-    }
     data = {
-        "cid": CID,
+        "cid": settings.cid,
         "tid": request.tid,
         "partner_order_id": request.order_id,
         "partner_user_id": user.id,
@@ -438,81 +910,183 @@ async def payment_approve(
     }
 
     try:
-        payment = db.query(Payment).filter(Payment.tid == request.tid).first()
+        payment = await run_in_threadpool(lambda: db.query(Payment).filter(Payment.tid == request.tid).first())
         if not payment:
             raise HTTPException(status_code=404, detail="결제 정보를 찾을 수 없습니다.")
 
-        if payment.status == "COMPLETED":
-            return {"data": "payment_success"}
-
-        response = requests.post(
-            "https://open-api.kakaopay.com/online/v1/payment/approve",
-            headers=headers,
-            json=data,
-        )
-        result = response.json()
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail=result)
-
-        payment.status = "COMPLETED"
-        db.commit()
-
-        db_user = db.query(User).filter(User.id == user.id).first()
-        song = db.query(Song).filter(Song.id == request.song_id).first()
+        if payment.status == "EXPIRED":
+            raise HTTPException(status_code=410, detail="만료된 결제 요청입니다. 다시 결제해주세요.")
+
+        # 승인 호출 전에 APPROVING 으로 남겨 둔다. 결과가 모호하게 끝나면 이 상태로 남아 재요청 시 다시 확인하고,
+        # 만료 처리 대상(READY)에서도 빠진다. 이미 COMPLETED 라도 다운로드 권한 부여는 다시 시도한다.
+        # 동시에 들어온 요청은 게이트웨이에서 한 번의 승인으로 합쳐지고, COMPLETED 로 바꾼 요청만 구매를 집계한다.
+        completed_now = False
+        if payment.status != "COMPLETED":
+            if not await run_in_threadpool(transition_payment, db, payment.id, ("READY", "APPROVING"), "APPROVING"):
+                await run_in_threadpool(db.refresh, payment)
+                if payment.status == "EXPIRED":
+                    raise HTTPException(status_code=410, detail="만료된 결제 요청입니다. 다시 결제해주세요.")
+            else:
+                try:
+                    await payment_gateway.approve(data)
+                except GatewayError as e:
+                    # 명확히 거절된 경우만 되돌린다. 5xx/연결 실패는 승인됐을 수 있어 APPROVING 으로 둔다.
+                    if e.status < 500:
+                        await run_in_threadpool(transition_payment, db, payment.id, ("APPROVING",), "READY")
+                    raise
+                completed_now = await run_in_threadpool(transition_payment, db, payment.id, ("APPROVING",), "COMPLETED")
+
+        song, granted = await run_in_threadpool(grant_download, db, user.id, request.song_id)
         if not song:
             raise HTTPException(status_code=404, detail="음원을 찾을 수 없습니다.")
-
-        db_user.downloads.append(song)
-        db.commit()
+        if granted:
+            recommendations.record(user.id, song.id)
+        entitlements.grant(user.id, song.id)
+        if completed_now:
+            trending.record(song.id, "purchase")
+            broker.publish(user_topic(user.id), "payment", {"order_id": request.order_id, "song_id": song.id, "status": "COMPLETED"})
 
         return {"data": "payment_success"}
 
+    except HTTPException:
+        raise
+    except GatewayError as e:
+        raise HTTPException(status_code=400, detail=e.body)
+    except GatewayUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# 실시간 알림 (SSE). 로그인하면 결제/처리 상태, 아니면 새 업로드만 받는다.
+# EventSource 는 헤더를 보낼 수 없으므로 ?token= 도 받는다. 연결이 오래 유지되므로 DB 세션을 잡지 않는다.
+@router.get("/events/stream")
+async def event_stream(
+    request: Request,
+    token: str | None = Query(None),
+    bearer: str | None = Depends(optional_oauth2_scheme),
+):
+    token = bearer or token
+    topics = [UPLOADS_TOPIC] + ([user_topic(decode_token(token)["sub"])] if token else [])
+    try:
+        subscription = broker.subscribe(topics)
+    except SubscriberLimitReached:
+        raise HTTPException(status_code=503, detail="알림 연결이 너무 많습니다.", headers={"Retry-After": "30"})
+
+    return StreamingResponse(
+        sse_stream(broker, subscription, resync="last-event-id" in request.headers),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # 음원 다운로드
-@app.get("/downloading/{song_id}")
+@router.get("/downloading/{song_id}")
 async def download_song(
     song_id: str,
-    user: User = Depends(verify_token),
-    db: Session = Depends(get_db)
+    request: Request,
+    user: Principal = Depends(verify_claims),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not song_id or song_id == "null":
         raise HTTPException(status_code=400, detail="잘못된 요청입니다.")
 
-    song = db.query(Song).filter(Song.id == song_id).first()
+    song = (await db.execute(select(Song.title, Song.file_url).where(Song.id == song_id))).first()
     if not song:
         raise HTTPException(status_code=404, detail="음원을 찾을 수 없습니다.")
 
-    if song_id not in [download.id for download in user.downloads]:
+    if not await entitlements.owns(db, user.id, song_id):
         raise HTTPException(status_code=403, detail="결제가 필요합니다.")
 
-    file_path = f"{AUDIO_DIR}/{Path(song.file_url).name}"
-
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail=f"파일을 찾을 수 없습니다: {file_path}")
+    file_path = media_store.local_path(song.file_url)
 
     encoded_filename = urllib.parse.quote(f"{song.title}.mp3")
 
-    return FileResponse(
+    response = await ranged_file_response(
+        request,
         file_path,
+        media_type="audio/mpeg",
         headers={
             "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
         }
     )
 
-# 유저 다운로드 리스트 조회
-@app.get("/downloads/{user_id}")
+    # 응답이 만들어진 뒤에만 센다 (404/416 은 예외로 빠지고 304 는 세지 않는다).
+    # 이어받기(Range) 요청은 처음 구간을 받을 때만 다운로드로 센다.
+    if response.status_code == 200 or (response.status_code == 206 and response.headers["Content-Range"].startswith("bytes 0-")):
+        counters.record(song_id, "download_count")
+        trending.record(song_id, "download")
+    return response
+
+# 음원 구매 여부 일괄 조회
+@router.get("/entitlements")
+async def get_entitlements(
+    song_ids: list[str] = Query(..., alias="song_id"),
+    user: Principal = Depends(verify_claims),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if len(song_ids) > ENTITLEMENT_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {ENTITLEMENT_BATCH_LIMIT}곡까지 조회할 수 있습니다.")
+
+    return {"data": await entitlements.owned_among(db, user.id, song_ids)}
+
+# 유저 다운로드 리스트 조회 (다음 페이지 커서는 X-Next-Cursor 헤더로 전달)
+@router.get("/downloads/{user_id}")
 async def get_user_downloads(
     user_id: str,
-    user: User = Depends(verify_token),
-    db: Session = Depends(get_db)
+    limit: int | None = Query(None, ge=1, le=100),
+    cursor: str | None = Query(None),
+    user: Principal = Depends(verify_claims),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if user.id != user_id:
         raise HTTPException(status_code=403, detail="권한이 없습니다.")
 
-    db_user = db.query(User).filter(User.id == user.id).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
+    query = (
+        select(*song_schema_columns())
+        .join(user_downloads, user_downloads.c.song_id == Song.id)
+        .where(user_downloads.c.user_id == user.id)
+        .order_by(*keyset_order())
+    )
+    if cursor:
+        query = query.where(keyset_filter(cursor))
+    if limit:
+        query = query.limit(limit + 1)
+    rows, next_cursor = page_rows((await db.execute(query)).all(), limit)
+
+    songs = SongList.validate_python(rows, from_attributes=True)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(content=SongList.dump_json(songs), media_type="application/json", headers=headers)
+
+# .env 는 app 패키지 import 시점에 이미 읽혀 있다 (app/__init__.py).
+def create_app(app_settings: Settings | None = None) -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+    configure(app.state, app_settings or Settings.from_env())
+    app.add_middleware(UploadSizeLimitMiddleware)
+
+    # CORS 설정
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Waveform-Bins"],
+    )
+    app.middleware("http")(collect_metrics)
+    app.middleware("http")(add_security_headers)
+
+    app.include_router(router)
+    app.mount("/media", StaticFiles(directory=app.state.settings.media_root, check_dir=False), name="media")
+    return app
+
+# 예전 진입점(uvicorn app.main:app) 호환용. import 시점에는 아무것도 만들지 않고 첫 ASGI 호출(lifespan) 때 앱을 만든다.
+class _LazyApp:
+    def __init__(self, factory):
+        self.factory = factory
+        self.instance: FastAPI | None = None
+
+    async def __call__(self, scope, receive, send):
+        if self.instance is None:
+            self.instance = self.factory()
+        await self.instance(scope, receive, send)
 
-    return db_user.downloads
\ No newline at end of file
+app = _LazyApp(create_app)
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from sqlalchemy import delete, select, update
+from starlette.concurrency import run_in_threadpool
+
+from app.database.database import SessionLocal
+from app.database.models import MediaBlob, Payment, Song
+from app.storage.media_store import MediaStore, CONTENT_KEY
+
+logger = logging.getLogger(__name__)
+
+GC_INTERVAL = float(os.getenv("GC_INTERVAL", 3600))
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", 500))
+# 업로드 중이라 아직 DB 에 커밋되지 않은 파일을 지우지 않도록 이보다 최근 파일은 건너뛴다.
+GC_MIN_AGE = float(os.getenv("GC_MIN_AGE", 3600))
+PAYMENT_READY_TTL = float(os.getenv("PAYMENT_READY_TTL", 3600))
+MEDIA_PREFIXES = ("audio", "image")
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+# 미디어 디렉터리를 songs 테이블과 대조해 고아 파일을 지우고, 방치된 결제 요청을 만료시킨다.
+# 파일 목록과 DB 조회를 GC_BATCH_SIZE 단위로 나눠 짧은 트랜잭션만 사용한다.
+class GarbageCollector:
+    def __init__(
+        self,
+        store: MediaStore,
+        song_dirs: list[Path],
+        waveform_dir: Path,
+        tmp_dir: Path,
+        interval: float = GC_INTERVAL,
+        batch_size: int = GC_BATCH_SIZE,
+        min_age: float = GC_MIN_AGE,
+    ):
+        self.store = store
+        self.song_dirs = song_dirs
+        self.waveform_dir = waveform_dir
+        self.tmp_dir = tmp_dir
+        self.interval = interval
+        self.batch_size = batch_size
+        self.min_age = min_age
+        self.last_report: dict | None = None
+        self._task: asyncio.Task | None = None
+
+    def _is_old(self, mtime: float, now: float) -> bool:
+        return now - mtime >= self.min_age
+
+    def _sweep_media(self, prefix: str, now: float) -> tuple[int, int]:
+        files = reclaimed = 0
+        backend = self.store.backend
+        for keys in batched(backend.iter_keys(prefix), self.batch_size):
+            candidates = []
+            for key in keys:
+                try:
+                    if self._is_old(backend.modified_at(key), now):
+                        candidates.append(key)
+                except FileNotFoundError:
+                    continue
+            if not candidates:
+                continue
+
+            urls = {self.store.url_for(key): key for key in candidates}
+            with SessionLocal() as db:
+                referenced = set(db.scalars(select(Song.file_url).where(Song.file_url.in_(urls))))
+                referenced |= set(db.scalars(select(Song.image).where(Song.image.in_(urls))))
+                orphans = [key for url, key in urls.items() if url not in referenced]
+                content_keys = [key for key in orphans if CONTENT_KEY.match(key)]
+                if content_keys:
+                    # 행을 먼저 지워 잠근 뒤 남은(참조 수가 있는) blob 을 다시 확인한다.
+                    # 파일은 커밋 전에 지우므로, 그 사이 같은 blob 을 참조하려는 업로드는 커밋 뒤 파일을 다시 둔다.
+                    db.execute(delete(MediaBlob).where(MediaBlob.key.in_(content_keys), MediaBlob.refcount <= 0))
+                    live = set(db.scalars(select(MediaBlob.key).where(MediaBlob.key.in_(content_keys))))
+                    orphans = [key for key in orphans if key not in live]
+
+                for key in orphans:
+                    try:
+                        size = backend.size(key)
+                        backend.delete(key)
+                    except FileNotFoundError:
+                        continue
+                    files += 1
+                    reclaimed += size
+                db.commit()
+        return files, reclaimed
+
+    # hls/thumbs 의 곡별 디렉터리와 waveform 파일은 이름이 곧 song id 이다.
+    def _sweep_song_outputs(self, now: float) -> tuple[int, int]:
+        entries = []
+        for directory in self.song_dirs:
+            if directory.is_dir():
+                entries += [(path, path.name) for path in directory.iterdir() if path.is_dir()]
+        if self.waveform_dir.is_dir():
+            entries += [(path, path.stem) for path in self.waveform_dir.glob("*.bin")]
+
+        removed = reclaimed = 0
+        for batch in batched(entries, self.batch_size):
+            batch = [(path, song_id) for path, song_id in batch if path.exists() and self._is_old(path.stat().st_mtime, now)]
+            if not batch:
+                continue
+            with SessionLocal() as db:
+                existing = set(db.scalars(select(Song.id).where(Song.id.in_({song_id for _, song_id in batch}))))
+            for path, song_id in batch:
+                if song_id in existing:
+                    continue
+                if path.is_dir():
+                    reclaimed += sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    reclaimed += path.stat().st_size
+                    path.unlink(missing_ok=True)
+                removed += 1
+        return removed, reclaimed
+
+    # 업로드 도중 프로세스가 죽어 남은 임시 파일
+    def _sweep_tmp(self, now: float) -> tuple[int, int]:
+        removed = reclaimed = 0
+        if not self.tmp_dir.is_dir():
+            return removed, reclaimed
+        for path in self.tmp_dir.glob("*.part"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if self._is_old(stat.st_mtime, now):
+                path.unlink(missing_ok=True)
+                removed += 1
+                reclaimed += stat.st_size
+        return removed, reclaimed
+
+    def _expire_payments(self, ttl: float) -> int:
+        cutoff = datetime.now() - timedelta(seconds=ttl)
+        expired = 0
+        while True:
+            with SessionLocal() as db:
+                ids = list(db.scalars(
+                    select(Payment.id)
+                    .where(Payment.status == "READY", Payment.created_at < cutoff)
+                    .limit(self.batch_size)
+                ))
+                if not ids:
+                    return expired
+                db.execute(
+                    update(Payment).where(Payment.id.in_(ids), Payment.status == "READY").values(status="EXPIRED")
+                )
+                db.commit()
+            expired += len(ids)
+
+    def collect(self) -> dict:
+        started = time.monotonic()
+        now = time.time()
+        report = {"started_at": datetime.now().isoformat(timespec="seconds")}
+        for prefix in MEDIA_PREFIXES:
+            report[f"{prefix}_files"], report[f"{prefix}_bytes"] = self._sweep_media(prefix, now)
+        report["song_outputs"], report["song_output_bytes"] = self._sweep_song_outputs(now)
+        report["tmp_files"], report["tmp_bytes"] = self._sweep_tmp(now)
+        report["payments_expired"] = self._expire_payments(PAYMENT_READY_TTL)
+        report["duration_s"] = round(time.monotonic() - started, 3)
+        return report
+
+    async def run_once(self) -> dict:
+        report = await run_in_threadpool(self.collect)
+        self.last_report = report
+        logger.info("gc finished: %s", report)
+        return report
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("gc run failed")
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,34 @@
+"""스키마 생성/변경 단계. 앱 시작과 분리해 배포 시 한 번만 실행한다.
+
+    python -m app.migrate
+"""
+from sqlalchemy import inspect, text
+
+from app.settings import Settings
+
+# create_all 은 이미 있는 테이블에 컬럼을 추가하지 않으므로, 나중에 추가된 컬럼은 여기서 ALTER 한다.
+# 기존 곡은 처리 파이프라인 이전에 올라온 것이라 status 는 ready 로 채운다.
+ADDED_COLUMNS = [
+    ("songs", "status", "VARCHAR(20) NOT NULL DEFAULT 'ready'"),
+    ("songs", "play_count", "INTEGER DEFAULT 0"),
+    ("songs", "image_key", "VARCHAR(64)"),
+]
+
+def add_missing_columns(engine):
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            existing = {info["name"] for info in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+def migrate(database_url: str | None = None):
+    from app.database import models  # 테이블을 Base.metadata 에 등록
+    from app.database.database import Base, configure_database
+
+    engine = configure_database(database_url)
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+
+if __name__ == "__main__":
+    migrate(Settings.from_env().database_url)
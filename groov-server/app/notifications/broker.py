@@ -0,0 +1,262 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from starlette.concurrency import run_in_threadpool
+
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+EVENT_BROKER = os.getenv("EVENT_BROKER", "local")
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", 0.5))
+EVENT_RETENTION = float(os.getenv("EVENT_RETENTION", 300))
+# 구독자별 대기열 크기. 가득 차면 쌓인 메시지를 버리고 resync 하나로 대체한다.
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 100))
+EVENT_MAX_SUBSCRIBERS = int(os.getenv("EVENT_MAX_SUBSCRIBERS", 10_000))
+# 프록시가 유휴 연결을 끊지 않도록 보내는 주석 줄 간격
+EVENT_HEARTBEAT = float(os.getenv("EVENT_HEARTBEAT", 15))
+EVENT_RETRY_MS = 3000
+
+UPLOADS_TOPIC = "uploads"
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+@dataclass(frozen=True)
+class Message:
+    id: str
+    topic: str
+    event: str
+    data: dict
+
+    # SSE 형식 (빈 줄로 끝나는 필드 묶음)
+    def encode(self) -> bytes:
+        lines = [f"id: {self.id}"] if self.id else []
+        lines += [f"event: {self.event}", f"data: {json.dumps(self.data, ensure_ascii=False, separators=(',', ':'))}"]
+        return ("\n".join(lines) + "\n\n").encode()
+
+# 놓친 메시지가 있으니 목록을 다시 불러오라는 신호
+RESYNC = Message("", "", "resync", {})
+
+class Subscription:
+    def __init__(self, topics: list[str], size: int = EVENT_QUEUE_SIZE):
+        self.topics = frozenset(topics)
+        self.dropped = 0
+        self._queue: asyncio.Queue[Message] = asyncio.Queue(size)
+
+    # 느린 소비자 때문에 발행자가 기다리거나 메모리가 늘지 않도록 절대 블록하지 않는다.
+    def offer(self, message: Message):
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+                self.dropped += 1
+            self._queue.put_nowait(RESYNC)
+
+    async def get(self, timeout: float) -> Message | None:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class SubscriberLimitReached(Exception):
+    pass
+
+# 프로세스 안의 구독자에게 토픽별로 나눠 준다. 워커가 하나일 때는 이것으로 충분하다.
+# 다른 전달 방식은 이 클래스를 상속해 publish/start/stop 을 바꾸고, 받은 메시지를 _deliver 로 넘긴다.
+class LocalBroker:
+    def __init__(self, max_subscribers: int = EVENT_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self.published = 0
+        self.dropped = 0
+        self._topics: dict[str, set[Subscription]] = defaultdict(set)
+        self._subscribers = 0
+        self._ids = itertools.count(1)
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def subscribers(self) -> int:
+        return self._subscribers
+
+    def subscribe(self, topics: list[str]) -> Subscription:
+        if self._subscribers >= self.max_subscribers:
+            raise SubscriberLimitReached()
+        subscription = Subscription(topics)
+        for topic in subscription.topics:
+            self._topics[topic].add(subscription)
+        self._subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+        self._subscribers -= 1
+        self.dropped += subscription.dropped
+
+    def _deliver(self, message: Message):
+        for subscription in self._topics.get(message.topic, ()):
+            subscription.offer(message)
+
+    def _in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    # 이벤트 루프 밖(스레드풀)에서 불려도 구독자 대기열은 루프 스레드에서만 건드린다.
+    def publish(self, topic: str, event: str, data: dict):
+        self.published += 1
+        message = Message(str(next(self._ids)), topic, event, data)
+        if self._loop is not None and not self._in_loop():
+            self._loop.call_soon_threadsafe(self._deliver, message)
+        else:
+            self._deliver(message)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self._loop = None
+
+# 여러 uvicorn 워커용: 발행은 공유 SQLite 파일에 모아 쓰고, 각 워커가 새 행을 읽어 자기 구독자에게 나눠 준다.
+# 이벤트 id 가 워커 사이에서 같으므로 클라이언트가 어느 워커에 다시 붙어도 순서가 유지된다.
+class SQLiteBroker(LocalBroker):
+    def __init__(
+        self,
+        path: str | Path = Settings.event_broker_path,
+        poll_interval: float = EVENT_POLL_INTERVAL,
+        retention: float = EVENT_RETENTION,
+        max_subscribers: int = EVENT_MAX_SUBSCRIBERS,
+    ):
+        super().__init__(max_subscribers)
+        self.path = str(path)
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._outbox: list[tuple[str, str, str, float]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_id = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # create_app 이 path 를 설정으로 바꾸면 이전 경로의 연결은 버린다.
+        if conn is None or self._local.path != self.path:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._local.path = self.path
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def publish(self, topic: str, event: str, data: dict):
+        self.published += 1
+        with self._lock:
+            self._outbox.append((topic, event, json.dumps(data), time.time()))
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _exchange(self, outbox: list[tuple[str, str, str, float]]) -> list[tuple]:
+        conn = self._connect()
+        if outbox:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT INTO events (topic, event, data, created_at) VALUES (?, ?, ?, ?)", outbox)
+                conn.execute("DELETE FROM events WHERE created_at < ?", (time.time() - self.retention,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return conn.execute(
+            "SELECT id, topic, event, data FROM events WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+
+    async def poll(self):
+        with self._lock:
+            outbox, self._outbox = self._outbox, []
+        try:
+            rows = await run_in_threadpool(self._exchange, outbox)
+        except Exception:
+            logger.exception("event broker poll failed, %s events kept for retry", len(outbox))
+            with self._lock:
+                self._outbox[:0] = outbox
+            return
+        for row_id, topic, event, data in rows:
+            self._last_id = row_id
+            if topic in self._topics:
+                self._deliver(Message(str(row_id), topic, event, json.loads(data)))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.poll()
+
+    async def start(self):
+        await super().start()
+        if self._task is None:
+            # 시작 전에 쌓인 이벤트는 다시 보내지 않는다.
+            row = await run_in_threadpool(lambda: self._connect().execute("SELECT MAX(id) FROM events").fetchone())
+            self._last_id = row[0] or 0
+            # asyncio 객체는 처음 쓰인 이벤트 루프에 묶이므로 시작할 때 새로 만든다 (앱을 다시 띄우는 경우).
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.poll()
+        await super().stop()
+
+# 클라이언트가 다시 연결한 경우(Last-Event-ID) 그 사이 이벤트는 보장하지 않으므로 resync 부터 보낸다.
+async def sse_stream(broker: LocalBroker, subscription: Subscription, resync: bool = False, heartbeat: float = EVENT_HEARTBEAT):
+    try:
+        yield f"retry: {EVENT_RETRY_MS}\n\n".encode()
+        if resync:
+            yield RESYNC.encode()
+        while True:
+            message = await subscription.get(heartbeat)
+            yield message.encode() if message is not None else b": ping\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+def create_broker(kind: str = EVENT_BROKER) -> LocalBroker:
+    if kind == "local":
+        return LocalBroker()
+    if kind == "sqlite":
+        return SQLiteBroker()
+    raise ValueError(f"unknown EVENT_BROKER: {kind}")
+
+broker = create_broker()
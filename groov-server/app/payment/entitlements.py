@@ -0,0 +1,72 @@
+import os
+import threading
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import user_downloads
+
+ENTITLEMENT_CACHE_SIZE = int(os.getenv("ENTITLEMENT_CACHE_SIZE", 10000))
+ENTITLEMENT_CACHE_TTL = float(os.getenv("ENTITLEMENT_CACHE_TTL", 600))
+ENTITLEMENT_BATCH_LIMIT = 100
+
+# 구매 여부 확인. user_downloads 의 (user_id, song_id) 기본키로 조회한다.
+# 다른 워커에서 방금 결제된 곡이 거부되지 않도록 "보유" 결과만 캐시한다.
+class EntitlementService:
+    def __init__(self, maxsize: int = ENTITLEMENT_CACHE_SIZE, ttl: float = ENTITLEMENT_CACHE_TTL):
+        self._owned = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def _cached(self, user_id: str) -> set[str]:
+        with self._lock:
+            return set(self._owned.get(user_id, ()))
+
+    def _remember(self, user_id: str, song_ids):
+        with self._lock:
+            owned = self._owned.get(user_id)
+            if owned is None:
+                owned = set()
+            self._owned[user_id] = owned | set(song_ids)
+
+    async def owns(self, db: AsyncSession, user_id: str, song_id: str) -> bool:
+        if song_id in self._cached(user_id):
+            return True
+
+        row = (
+            await db.execute(
+                select(user_downloads.c.song_id)
+                .where(user_downloads.c.user_id == user_id, user_downloads.c.song_id == song_id)
+            )
+        ).first()
+        if row is None:
+            return False
+        self._remember(user_id, [song_id])
+        return True
+
+    async def owned_among(self, db: AsyncSession, user_id: str, song_ids: list[str]) -> dict[str, bool]:
+        cached = self._cached(user_id)
+        unknown = [song_id for song_id in dict.fromkeys(song_ids) if song_id not in cached]
+        found = set()
+        if unknown:
+            rows = await db.execute(
+                select(user_downloads.c.song_id)
+                .where(user_downloads.c.user_id == user_id, user_downloads.c.song_id.in_(unknown))
+            )
+            found = {song_id for (song_id,) in rows.all()}
+            if found:
+                self._remember(user_id, found)
+        return {song_id: song_id in cached or song_id in found for song_id in song_ids}
+
+    def grant(self, user_id: str, song_id: str):
+        self._remember(user_id, [song_id])
+
+    def revoke_song(self, song_id: str):
+        with self._lock:
+            for owned in self._owned.values():
+                owned.discard(song_id)
+
+    def invalidate_user(self, user_id: str):
+        with self._lock:
+            self._owned.pop(user_id, None)
+
+entitlements = EntitlementService()
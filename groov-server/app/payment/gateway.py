@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# 카카오페이 환경 변수
+KAKAO_DEV_KEY = os.getenv("KAKAO_DEV_KEY")
+KAKAOPAY_BASE_URL = os.getenv("KAKAOPAY_BASE_URL", "https://open-api.kakaopay.com/online/v1/payment")
+REDIRECT_BASE_URL = os.getenv("REDIRECT_BASE_URL")
+
+# 게이트웨이 호출 설정
+PAYMENT_GATEWAY = os.getenv("PAYMENT_GATEWAY", "kakao")
+PAYMENT_CONNECT_TIMEOUT = float(os.getenv("PAYMENT_CONNECT_TIMEOUT", 3))
+PAYMENT_READ_TIMEOUT = float(os.getenv("PAYMENT_READ_TIMEOUT", 10))
+PAYMENT_MAX_RETRIES = int(os.getenv("PAYMENT_MAX_RETRIES", 2))
+PAYMENT_POOL_SIZE = int(os.getenv("PAYMENT_POOL_SIZE", 50))
+PAYMENT_BREAKER_THRESHOLD = int(os.getenv("PAYMENT_BREAKER_THRESHOLD", 5))
+PAYMENT_BREAKER_RESET = float(os.getenv("PAYMENT_BREAKER_RESET", 30))
+FAKE_GATEWAY_LATENCY = float(os.getenv("FAKE_GATEWAY_LATENCY", 0))
+
+# 이미 승인된 결제건에 다시 승인을 요청했을 때의 카카오페이 오류 코드
+ALREADY_APPROVED_CODES = {-702}
+APPROVED_ORDER_STATUS = "SUCCESS_PAYMENT"
+
+def error_code(body) -> int | None:
+    return body.get("error_code") if isinstance(body, dict) else None
+
+class GatewayError(Exception):
+    def __init__(self, status: int, body):
+        super().__init__(f"payment gateway error {status}")
+        self.status = status
+        self.body = body
+
+class GatewayUnavailable(Exception):
+    pass
+
+# half-open 에서는 시험 호출 하나만 내보내고, 그 결과가 나올 때까지 나머지는 open 처럼 거절한다.
+# 시험 호출이 취소되어 결과를 남기지 못하면 reset_timeout 뒤에 다음 호출이 시험 호출이 된다.
+class CircuitBreaker:
+    def __init__(self, threshold: int = PAYMENT_BREAKER_THRESHOLD, reset_timeout: float = PAYMENT_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probe_started_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "half-open":
+            now = time.monotonic()
+            if self.probe_started_at is None or now - self.probe_started_at >= self.reset_timeout:
+                self.probe_started_at = now
+                return
+        if state != "closed":
+            raise GatewayUnavailable("결제 서버 응답 지연으로 잠시 후 다시 시도해주세요.")
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            self.probe_started_at = None
+
+class PaymentGateway:
+    async def ready(self, data: dict) -> dict:
+        raise NotImplementedError
+
+    async def approve(self, data: dict) -> dict:
+        raise NotImplementedError
+
+    # 주문 상태 조회 (data: cid, tid)
+    async def order(self, data: dict) -> dict:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class KakaoPayGateway(PaymentGateway):
+    def __init__(self, base_url: str = KAKAOPAY_BASE_URL, secret_key: str | None = KAKAO_DEV_KEY):
+        self.base_url = base_url.rstrip("/")
+        self.secret_key = secret_key
+        self.breaker = CircuitBreaker()
+        self._session = None
+        self._approvals: dict[str, asyncio.Future] = {}
+
+    # 커넥션 재사용을 위해 워커당 하나의 세션을 공유한다.
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=PAYMENT_POOL_SIZE, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(
+                    total=PAYMENT_CONNECT_TIMEOUT + PAYMENT_READ_TIMEOUT,
+                    connect=PAYMENT_CONNECT_TIMEOUT,
+                    sock_read=PAYMENT_READ_TIMEOUT,
+                ),
+                headers={
+                    "Authorization": f"SECRET_KEY {self.secret_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._session
+
+    async def _post(self, path: str, data: dict, retries: int) -> dict:
+        import aiohttp
+
+        self.breaker.before_call()
+        attempt = 0
+        while True:
+            try:
+                async with self._get_session().post(f"{self.base_url}/{path}", json=data) as response:
+                    try:
+                        result = await response.json(content_type=None)
+                    except ValueError:
+                        # 프록시 오류 페이지처럼 JSON 이 아닌 응답은 일시적인 상위 장애로 보고 재시도한다.
+                        body = (await response.text(errors="replace"))[:200]
+                        raise GatewayError(max(response.status, 502), {"error": "invalid gateway response", "body": body})
+                    if response.status >= 500:
+                        raise GatewayError(response.status, result)
+                    self.breaker.record_success()
+                    if response.status != 200:
+                        raise GatewayError(response.status, result)
+                    return result
+            except GatewayError as e:
+                if e.status < 500:
+                    raise
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+
+            self.breaker.record_failure()
+            if attempt >= retries or self.breaker.state == "open":
+                if isinstance(error, GatewayError):
+                    raise error
+                raise GatewayUnavailable(f"결제 서버에 연결할 수 없습니다: {error!r}")
+            attempt += 1
+            logger.warning("kakaopay %s retry %s: %r", path, attempt, error)
+            await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+
+    # ready 는 재시도 시 중복 결제건이 생길 수 있어 연결 단계 실패만 한 번 더 시도한다.
+    async def ready(self, data: dict) -> dict:
+        return await self._post("ready", data, retries=min(PAYMENT_MAX_RETRIES, 1))
+
+    async def order(self, data: dict) -> dict:
+        return await self._post("order", {"cid": data["cid"], "tid": data["tid"]}, retries=PAYMENT_MAX_RETRIES)
+
+    # 승인은 재시도하므로, 첫 시도가 실제로는 성공했는데 응답만 잃은 경우 재시도는 "이미 승인됨" 으로 실패한다.
+    # 이렇게 결과가 모호할 때는 주문 상태를 조회해 승인됐으면 성공으로 본다.
+    async def _approve(self, data: dict) -> dict:
+        try:
+            return await self._post("approve", data, retries=PAYMENT_MAX_RETRIES)
+        except GatewayError as e:
+            if e.status < 500 and error_code(e.body) not in ALREADY_APPROVED_CODES:
+                raise
+            error = e
+        except GatewayUnavailable as e:
+            error = e
+
+        try:
+            order = await self.order(data)
+        except (GatewayError, GatewayUnavailable):
+            logger.warning("kakaopay order lookup failed for %s after %r", data["tid"], error)
+            raise error
+        if order.get("status") != APPROVED_ORDER_STATUS:
+            raise error
+        logger.info("kakaopay approve for %s recovered from order status after %r", data["tid"], error)
+        return order
+
+    # 같은 tid 에 대한 동시 승인 요청은 하나의 호출 결과를 공유한다.
+    async def approve(self, data: dict) -> dict:
+        tid = data["tid"]
+        pending = self._approvals.get(tid)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._approvals[tid] = future
+        try:
+            result = await self._approve(data)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._approvals.pop(tid, None)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+# 부하 테스트/오프라인 개발용 가짜 게이트웨이
+class FakePaymentGateway(PaymentGateway):
+    def __init__(self, latency: float = FAKE_GATEWAY_LATENCY):
+        self.latency = latency
+        self.approved: set[str] = set()
+
+    async def ready(self, data: dict) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        tid = f"T{uuid.uuid4().hex[:19]}"
+        return {
+            "tid": tid,
+            "next_redirect_pc_url": f"{REDIRECT_BASE_URL}/payment/success?pg_token=fake-{tid}",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    async def approve(self, data: dict) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.approved.add(data["tid"])
+        return {
+            "tid": data["tid"],
+            "partner_order_id": data["partner_order_id"],
+            "partner_user_id": data["partner_user_id"],
+            "approved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    async def order(self, data: dict) -> dict:
+        return {"tid": data["tid"], "status": APPROVED_ORDER_STATUS if data["tid"] in self.approved else "READY"}
+
+def create_gateway(kind: str = PAYMENT_GATEWAY) -> PaymentGateway:
+    if kind == "fake":
+        return FakePaymentGateway()
+    return KakaoPayGateway()
+
+payment_gateway = create_gateway()
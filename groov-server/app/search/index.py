@@ -0,0 +1,180 @@
+import heapq
+import threading
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+
+# 한글 제목은 띄어쓰기가 일정하지 않으므로 공백 토큰화 대신 문자 n-gram 으로 색인한다.
+NGRAM_SIZES = (1, 2, 3)
+TITLE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.5
+# 편집 거리를 계산할 후보 수 (겹치는 n-gram 이 많은 순)
+CANDIDATE_LIMIT = 50
+# 제목/설명은 20자까지라 그보다 긴 검색어는 앞부분만 쓴다 (n-gram 수와 편집 거리 DP 비용 제한).
+MAX_QUERY_LENGTH = 20
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return " ".join(text.split())
+
+def _grams_of(text: str, n: int) -> set[str]:
+    if n == 1:
+        return set(text)
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+def ngrams(text: str, sizes=NGRAM_SIZES) -> set[str]:
+    # 띄어쓰기 차이("봄 날" / "봄날")를 흡수하도록 공백을 제거한 문자열 기준으로 자른다.
+    compact = text.replace(" ", "")
+    grams = set()
+    for n in sizes:
+        grams |= _grams_of(compact, n)
+    return grams
+
+def query_grams(query: str) -> set[str]:
+    # 후보를 넓게 모으기 위해 bigram 을 쓰고, 짧은 검색어는 한 글자 오타로 bigram 이 모두 어긋날 수 있어 unigram 도 쓴다.
+    compact = query.replace(" ", "")
+    if len(compact) <= 3:
+        return ngrams(compact, sizes=(1, 2))
+    return ngrams(compact, sizes=(2,))
+
+# 한글은 자모로 풀어 비교한다. "봄낳" 과 "봄날" 은 음절로는 한 글자 전체가 다르지만 자모로는 받침 하나 차이다.
+def decompose(text: str) -> str:
+    return unicodedata.normalize("NFD", text.replace(" ", ""))
+
+# 검색어 길이(자모 기준)에 따라 허용하는 오타 수
+def allowed_edits(length: int) -> int:
+    return min(length // 4, 3)
+
+# text 의 어느 부분 문자열과 pattern 의 최소 편집 거리 (삽입/삭제/치환/인접 전치)
+# max_distance 를 주면 그보다 큰 값은 max_distance + 1 로 잘라 반환하고, 각 열에서 한도 안에 있는
+# 마지막 행까지만 계산한다 (그 아래 행은 다음 열에서도 한도를 넘는다).
+def substring_distance(pattern: str, text: str, max_distance: int | None = None) -> int:
+    if pattern in text:
+        return 0
+    m = len(pattern)
+    limit = m if max_distance is None else min(max_distance, m)
+    cap = limit + 1
+    before, previous = None, [min(i, cap) for i in range(m + 1)]
+    last = limit
+    best = previous[m]
+    for j, char in enumerate(text, start=1):
+        # 시작 위치는 자유이므로 첫 행은 항상 0 이다.
+        current = [0] + [cap] * m
+        end = min(m, last + 1)
+        for i in range(1, end + 1):
+            value = min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (pattern[i - 1] != char))
+            if i > 1 and j > 1 and pattern[i - 1] == text[j - 2] and pattern[i - 2] == char:
+                value = min(value, before[i - 2] + 1)
+            current[i] = min(value, cap)
+        while end > 0 and current[end] > limit:
+            end -= 1
+        last = end
+        best = min(best, current[m])
+        if best == 0:
+            break
+        before, previous = previous, current
+    return best
+
+@dataclass
+class SearchDocument:
+    song_id: str
+    title: str
+    description: str
+    grams: dict[str, float]
+    title_key: str
+    description_key: str
+
+class SearchIndex:
+    def __init__(self):
+        self._documents: dict[str, SearchDocument] = {}
+        # gram -> {song_id: 가중치}
+        self._postings: dict[str, dict[str, float]] = defaultdict(dict)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _grams(self, title: str, description: str) -> dict[str, float]:
+        weights: dict[str, float] = {}
+        for gram in ngrams(description):
+            weights[gram] = DESCRIPTION_WEIGHT
+        for gram in ngrams(title):
+            weights[gram] = TITLE_WEIGHT
+        return weights
+
+    def add(self, song_id: str, title: str, description: str):
+        with self._lock:
+            self._remove(song_id)
+            title, description = normalize(title), normalize(description)
+            document = SearchDocument(
+                song_id, title, description, self._grams(title, description), decompose(title), decompose(description)
+            )
+            self._documents[song_id] = document
+            for gram, weight in document.grams.items():
+                self._postings[gram][song_id] = weight
+
+    def remove(self, song_id: str):
+        with self._lock:
+            self._remove(song_id)
+
+    def _remove(self, song_id: str):
+        document = self._documents.pop(song_id, None)
+        if document is None:
+            return
+        for gram in document.grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            posting.pop(song_id, None)
+            if not posting:
+                del self._postings[gram]
+
+    def rebuild(self, rows):
+        with self._lock:
+            self._documents.clear()
+            self._postings.clear()
+            for song_id, title, description in rows:
+                self.add(song_id, title, description)
+
+    # n-gram 으로 후보를 모은 뒤 제목/설명의 부분 문자열과의 편집 거리로 오타를 허용해 순위를 매긴다.
+    # CPU 를 쓰는 동기 함수이므로 요청 경로에서는 스레드풀에서 호출한다. 잠금은 후보 수집 동안만 잡는다.
+    def search(self, query: str, limit: int = 20) -> list[str]:
+        query = normalize(query)[:MAX_QUERY_LENGTH].strip()
+        grams = query_grams(query)
+        if not grams:
+            return []
+        pattern = decompose(query)
+        max_edits = allowed_edits(len(pattern))
+
+        with self._lock:
+            scores: dict[str, float] = defaultdict(float)
+            for gram in grams:
+                for song_id, weight in self._postings.get(gram, {}).items():
+                    scores[song_id] += weight
+            candidates = [
+                self._documents[song_id] for song_id in heapq.nlargest(CANDIDATE_LIMIT, scores, key=scores.__getitem__)
+            ]
+
+        ranked = []
+        compact_query = query.replace(" ", "")
+        for document in candidates:
+            distance = substring_distance(pattern, document.title_key, max_edits)
+            if distance <= max_edits:
+                rank = TITLE_WEIGHT * (1 - distance / len(pattern))
+                if document.title.startswith(query):
+                    rank += 1.0
+                elif compact_query in document.title.replace(" ", ""):
+                    rank += 0.5
+            else:
+                distance = substring_distance(pattern, document.description_key, max_edits)
+                if distance > max_edits:
+                    continue
+                rank = DESCRIPTION_WEIGHT * (1 - distance / len(pattern))
+                if query in document.description:
+                    rank += 0.25
+            ranked.append((-rank, len(document.title), document.song_id))
+
+        ranked.sort()
+        return [song_id for _, _, song_id in ranked[:limit]]
+
+search_index = SearchIndex()
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+from app.database.database import SessionLocal
+from app.database.models import Song
+from app.search.index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+SEARCH_REFRESH_INTERVAL = float(os.getenv("SEARCH_REFRESH_INTERVAL", 10))
+SEARCH_REBUILD_INTERVAL = float(os.getenv("SEARCH_REBUILD_INTERVAL", 600))
+# 커밋이 늦어 기준 시각보다 이른 upload_date 로 들어온 곡을 놓치지 않도록 겹쳐서 읽는다.
+SEARCH_REFRESH_OVERLAP = timedelta(seconds=float(os.getenv("SEARCH_REFRESH_OVERLAP", 60)))
+
+# 색인은 워커마다 메모리에 있으므로, 다른 워커에서 올리거나 고친 곡(수정 시 upload_date 가 바뀐다)을
+# upload_date 기준으로 주기적으로 가져온다. 삭제는 검색 결과를 DB 에서 다시 거르므로 전체 재색인 때 정리한다.
+class SearchIndexSync:
+    def __init__(
+        self,
+        index: SearchIndex,
+        interval: float = SEARCH_REFRESH_INTERVAL,
+        rebuild_interval: float = SEARCH_REBUILD_INTERVAL,
+    ):
+        self.index = index
+        self.interval = interval
+        self.rebuild_interval = rebuild_interval
+        self._watermark: datetime | None = None
+        self._rebuilt_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    def rebuild(self):
+        with SessionLocal() as db:
+            watermark = db.scalar(select(func.max(Song.upload_date)))
+            self.index.rebuild(db.execute(select(Song.id, Song.title, Song.description)).all())
+        self._watermark = watermark
+        self._rebuilt_at = time.monotonic()
+
+    def refresh(self) -> int:
+        if self._watermark is None or time.monotonic() - self._rebuilt_at >= self.rebuild_interval:
+            self.rebuild()
+            return len(self.index)
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(Song.id, Song.title, Song.description, Song.upload_date)
+                .where(Song.upload_date >= self._watermark - SEARCH_REFRESH_OVERLAP)
+            ).all()
+        for song_id, title, description, upload_date in rows:
+            self.index.add(song_id, title, description)
+            self._watermark = max(self._watermark, upload_date)
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.refresh)
+            except Exception:
+                logger.exception("search index refresh failed")
+
+    async def start(self):
+        await run_in_threadpool(self.rebuild)
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
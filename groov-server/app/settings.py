@@ -0,0 +1,70 @@
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+# 작업 큐, 인기 차트, 추천, 이벤트 브로커처럼 실행 중에 쓰는 파일은 소스 트리 밖에 둔다.
+DATA_DIR = BASE_DIR.parent / "data"
+
+def load_env(path: str | Path | None = None):
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=path or BASE_DIR / ".env")
+
+def env_flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: str | None = None
+    media_root: Path = BASE_DIR / "media"
+    upload_tmp_dir: Path = BASE_DIR / "tmp"
+    data_dir: Path = DATA_DIR
+    job_queue_path: Path = DATA_DIR / "jobs.sqlite3"
+    trending_path: Path = DATA_DIR / "trending.sqlite3"
+    recommend_path: Path = DATA_DIR / "recommendations.npz"
+    event_broker_path: Path = DATA_DIR / "events.sqlite3"
+    cid: str | None = None
+    redirect_base_url: str | None = None
+    # 운영에서는 python -m app.migrate 로 스키마를 만든다. 로컬 개발/벤치마크에서만 시작 시 생성한다.
+    create_schema: bool = False
+    # 테스트에서 작업 워커, GC 같은 백그라운드 루프 없이 앱만 띄울 때 끈다.
+    background_tasks: bool = True
+
+    @property
+    def audio_dir(self) -> Path:
+        return self.media_root / "audio"
+
+    @property
+    def image_dir(self) -> Path:
+        return self.media_root / "image"
+
+    @property
+    def hls_dir(self) -> Path:
+        return self.media_root / "hls"
+
+    @property
+    def thumb_dir(self) -> Path:
+        return self.media_root / "thumbs"
+
+    @property
+    def waveform_dir(self) -> Path:
+        return self.media_root / "waveform"
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        data_dir = Path(os.getenv("DATA_DIR", DATA_DIR))
+        return cls(
+            database_url=os.getenv("DATABASE_URL"),
+            media_root=Path(os.getenv("MEDIA_ROOT", BASE_DIR / "media")),
+            upload_tmp_dir=Path(os.getenv("UPLOAD_TMP_DIR", BASE_DIR / "tmp")),
+            data_dir=data_dir,
+            job_queue_path=Path(os.getenv("JOB_QUEUE_PATH", data_dir / "jobs.sqlite3")),
+            trending_path=Path(os.getenv("TRENDING_PATH", data_dir / "trending.sqlite3")),
+            recommend_path=Path(os.getenv("RECOMMEND_PATH", data_dir / "recommendations.npz")),
+            event_broker_path=Path(os.getenv("EVENT_BROKER_PATH", data_dir / "events.sqlite3")),
+            cid=os.getenv("CID"),
+            redirect_base_url=os.getenv("REDIRECT_BASE_URL"),
+            create_schema=env_flag("CREATE_SCHEMA"),
+            background_tasks=env_flag("BACKGROUND_TASKS", True),
+        )
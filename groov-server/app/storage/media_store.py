@@ -0,0 +1,168 @@
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Iterator
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database.models import MediaBlob, Song
+from app.utils.upload import StagedFile
+
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "local")
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", Path(__file__).resolve().parent.parent / "media"))
+MEDIA_URL_PREFIX = "/media"
+
+# sha256 앞 4자리로 두 단계 디렉터리를 나눠 한 디렉터리에 파일이 몰리지 않게 한다. (audio/ab/cd/abcd....mp3)
+FANOUT_LEVELS = 2
+FANOUT_WIDTH = 2
+CONTENT_KEY = re.compile(r"^[a-z]+/(?:[0-9a-f]{2}/){2}[0-9a-f]{64}(?:\.[a-z0-9]{1,10})?$")
+SAFE_EXT = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+class StorageBackend:
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    # source 파일을 key 위치로 옮긴다.
+    def put(self, key: str, source: Path) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    # 스트리밍과 ffmpeg 가 읽을 로컬 경로. 원격 저장소는 로컬 캐시 경로를 돌려주도록 구현한다.
+    def local_path(self, key: str) -> Path:
+        raise NotImplementedError
+
+    def iter_keys(self, prefix: str) -> Iterator[str]:
+        raise NotImplementedError
+
+    def modified_at(self, key: str) -> float:
+        raise NotImplementedError
+
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+
+class LocalBackend(StorageBackend):
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def exists(self, key: str) -> bool:
+        return self.local_path(key).is_file()
+
+    def put(self, key: str, source: Path) -> None:
+        target = self.local_path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(source, target)
+        except OSError:
+            # 임시 디렉터리가 다른 파일시스템이면 복사 후 rename 한다.
+            partial = target.with_name(target.name + ".part")
+            shutil.copyfile(source, partial)
+            os.replace(partial, target)
+            Path(source).unlink(missing_ok=True)
+
+    def delete(self, key: str) -> None:
+        self.local_path(key).unlink(missing_ok=True)
+
+    def local_path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"invalid media key: {key}")
+        return path
+
+    def iter_keys(self, prefix: str) -> Iterator[str]:
+        base = self.root / prefix
+        if not base.is_dir():
+            return
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                yield (Path(dirpath) / filename).relative_to(self.root).as_posix()
+
+    def modified_at(self, key: str) -> float:
+        return self.local_path(key).stat().st_mtime
+
+    def size(self, key: str) -> int:
+        return self.local_path(key).stat().st_size
+
+class MediaStore:
+    def __init__(self, backend: StorageBackend, url_prefix: str = MEDIA_URL_PREFIX):
+        self.backend = backend
+        self.url_prefix = url_prefix
+
+    @staticmethod
+    def key_for(kind: str, sha256: str, filename: str | None) -> str:
+        ext = os.path.splitext(filename or "")[1].lower()
+        fanout = "/".join(sha256[i * FANOUT_WIDTH:(i + 1) * FANOUT_WIDTH] for i in range(FANOUT_LEVELS))
+        return f"{kind}/{fanout}/{sha256}{ext if SAFE_EXT.match(ext) else ''}"
+
+    def url_for(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def key_from_url(self, url: str) -> str:
+        return url.removeprefix(self.url_prefix + "/")
+
+    def local_path(self, url: str) -> Path:
+        return self.backend.local_path(self.key_from_url(url))
+
+    # 참조 수를 먼저 올린 뒤(행 잠금) 파일을 둔다. 같은 내용이 이미 있으면 임시 파일을 버리고 기존 blob 을 쓴다.
+    # collect 는 행을 지운 트랜잭션이 커밋되기 전에 파일을 지우므로, 그와 겹친 acquire 는 삭제가 끝난 뒤
+    # 새 행을 만들고 여기서 파일이 없음을 보고 다시 둔다. 호출한 쪽이 같은 트랜잭션을 커밋한다.
+    def add(self, db: Session, kind: str, staged: StagedFile, filename: str | None) -> str:
+        key = self.key_for(kind, staged.sha256, filename)
+        self.acquire(db, key, staged.size)
+        if self.backend.exists(key):
+            staged.discard()
+        else:
+            self.backend.put(key, staged.path)
+        return key
+
+    # 참조 수 증감은 호출한 쪽 트랜잭션 안에서 한다.
+    def acquire(self, db: Session, key: str, size: int):
+        if db.execute(update(MediaBlob).where(MediaBlob.key == key).values(refcount=MediaBlob.refcount + 1)).rowcount:
+            return
+        try:
+            with db.begin_nested():
+                db.execute(insert(MediaBlob).values(key=key, size=size, refcount=1))
+        except IntegrityError:
+            db.execute(update(MediaBlob).where(MediaBlob.key == key).values(refcount=MediaBlob.refcount + 1))
+
+    def release(self, db: Session, url: str):
+        key = self.key_from_url(url)
+        db.execute(update(MediaBlob).where(MediaBlob.key == key).values(refcount=MediaBlob.refcount - 1))
+
+    # release 한 트랜잭션이 커밋된 뒤 호출한다. 더 이상 참조되지 않는 blob 만 지운다.
+    def collect(self, db: Session, urls) -> list[str]:
+        removed = []
+        for url in set(urls):
+            key = self.key_from_url(url)
+            if CONTENT_KEY.match(key):
+                deleted = db.execute(delete(MediaBlob).where(MediaBlob.key == key, MediaBlob.refcount <= 0)).rowcount
+                if not deleted:
+                    db.commit()
+                    continue
+                # 행 삭제를 커밋하기 전에 파일을 지워, 같은 blob 을 새로 참조하려는 acquire 가 이 뒤로 밀리게 한다.
+                try:
+                    self.backend.delete(key)
+                except Exception:
+                    db.rollback()
+                    raise
+                db.commit()
+            # 저장소 도입 이전의 파일은 참조 수가 없으므로 다른 곡이 쓰지 않을 때만 지운다.
+            elif db.execute(select(Song.id).where(or_(Song.file_url == url, Song.image == url)).limit(1)).first():
+                continue
+            else:
+                self.backend.delete(key)
+            removed.append(key)
+        return removed
+
+def create_backend(kind: str = MEDIA_STORAGE, root: Path = MEDIA_ROOT) -> StorageBackend:
+    if kind == "local":
+        return LocalBackend(root)
+    raise ValueError(f"unknown MEDIA_STORAGE: {kind}")
+
+def create_media_store(kind: str = MEDIA_STORAGE) -> MediaStore:
+    return MediaStore(create_backend(kind))
+
+media_store = create_media_store()
@@ -0,0 +1,15 @@
+import os
+
+IMAGE_VARIANT_SIZES = [int(size) for size in os.getenv("IMAGE_VARIANT_SIZES", "64,256,512").split(",") if size.strip()]
+IMAGE_VARIANT_FORMAT = "webp"
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", 80))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# 원본 이미지 해시(image_key)를 파일명에 넣어 URL 이 바뀌므로 영구 캐시해도 안전하다.
+def variant_filename(size: int, image_key: str) -> str:
+    return f"{size}_{image_key}.{IMAGE_VARIANT_FORMAT}"
+
+def thumbnail_urls(song_id: str, image_key: str | None) -> dict[str, str] | None:
+    if not image_key:
+        return None
+    return {str(size): f"/images/{song_id}/{variant_filename(size, image_key)}" for size in IMAGE_VARIANT_SIZES}
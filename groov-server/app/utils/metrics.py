@@ -0,0 +1,194 @@
+import asyncio
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("groov.slow_request")
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 0))
+SLOW_REQUEST_MAX_STATEMENTS = 50
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.5))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            yield bound, total
+
+@dataclass
+class RequestStats:
+    sql_count: int = 0
+    sql_seconds: float = 0.0
+    statements: list = field(default_factory=list)
+
+current_request: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("current_request", default=None)
+
+def _labels(**labels) -> str:
+    body = ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in labels.items())
+    return "{" + body + "}" if body else ""
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(value)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_duration: dict[tuple, Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.request_sql_count: dict[tuple, Histogram] = defaultdict(lambda: Histogram(SQL_COUNT_BUCKETS))
+        self.sql_seconds: dict[tuple, float] = defaultdict(float)
+        self.sql_statements: dict[tuple, int] = defaultdict(int)
+        self.io_bytes: dict[str, int] = defaultdict(int)
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.loop_lag_last = 0.0
+        self.gauges = []
+        self._lag_task: asyncio.Task | None = None
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            self.request_duration[(method, route, status)].observe(seconds)
+            self.request_sql_count[(method, route)].observe(stats.sql_count)
+            self.sql_statements[(method, route)] += stats.sql_count
+            self.sql_seconds[(method, route)] += stats.sql_seconds
+
+    def add_bytes(self, direction: str, amount: int):
+        with self._lock:
+            self.io_bytes[direction] += amount
+
+    # 추가 게이지: () -> [(name, labels dict, value)] 를 반환하는 함수
+    def register_gauges(self, collect):
+        self.gauges.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP groov_http_request_duration_seconds Request duration by route.",
+                "# TYPE groov_http_request_duration_seconds histogram",
+            ]
+            for (method, route, status), histogram in sorted(self.request_duration.items()):
+                labels = dict(method=method, route=route, status=status)
+                for bound, total in histogram.cumulative():
+                    lines.append(f"groov_http_request_duration_seconds_bucket{_labels(**labels, le=_bound(bound))} {total}")
+                lines.append(f"groov_http_request_duration_seconds_sum{_labels(**labels)} {histogram.sum}")
+                lines.append(f"groov_http_request_duration_seconds_count{_labels(**labels)} {histogram.count}")
+
+            lines += [
+                "# HELP groov_request_sql_statements SQL statements executed per request.",
+                "# TYPE groov_request_sql_statements histogram",
+            ]
+            for (method, route), histogram in sorted(self.request_sql_count.items()):
+                labels = dict(method=method, route=route)
+                for bound, total in histogram.cumulative():
+                    lines.append(f"groov_request_sql_statements_bucket{_labels(**labels, le=_bound(bound))} {total}")
+                lines.append(f"groov_request_sql_statements_sum{_labels(**labels)} {histogram.sum}")
+                lines.append(f"groov_request_sql_statements_count{_labels(**labels)} {histogram.count}")
+
+            lines += ["# TYPE groov_sql_statements_total counter"]
+            for (method, route), total in sorted(self.sql_statements.items()):
+                lines.append(f"groov_sql_statements_total{_labels(method=method, route=route)} {total}")
+            lines += ["# TYPE groov_sql_seconds_total counter"]
+            for (method, route), total in sorted(self.sql_seconds.items()):
+                lines.append(f"groov_sql_seconds_total{_labels(method=method, route=route)} {total}")
+
+            lines += ["# TYPE groov_io_bytes_total counter"]
+            for direction, total in sorted(self.io_bytes.items()):
+                lines.append(f"groov_io_bytes_total{_labels(direction=direction)} {total}")
+
+            lines += ["# TYPE groov_event_loop_lag_seconds histogram"]
+            for bound, total in self.loop_lag.cumulative():
+                lines.append(f"groov_event_loop_lag_seconds_bucket{_labels(le=_bound(bound))} {total}")
+            lines.append(f"groov_event_loop_lag_seconds_sum {self.loop_lag.sum}")
+            lines.append(f"groov_event_loop_lag_seconds_count {self.loop_lag.count}")
+            lines += ["# TYPE groov_event_loop_lag_last_seconds gauge", f"groov_event_loop_lag_last_seconds {self.loop_lag_last}"]
+
+        for collect in self.gauges:
+            try:
+                samples = collect()
+            except Exception:
+                continue
+            for name, labels, value in samples:
+                lines.append(f"{name}{_labels(**labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    # 이벤트 루프가 주기적인 sleep 에서 늦게 깨어난 만큼을 지연으로 본다.
+    async def _measure_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, loop.time() - started - LOOP_LAG_INTERVAL)
+            with self._lock:
+                self.loop_lag.observe(lag)
+                self.loop_lag_last = lag
+
+    async def start(self):
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._measure_loop_lag())
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+metrics = MetricsRegistry()
+
+# 모든 엔진(비동기 엔진의 sync_engine 포함)의 SQL 실행을 현재 요청에 집계한다.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("groov_query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["groov_query_start"].pop()
+    stats = current_request.get()
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats.sql_count += 1
+    stats.sql_seconds += elapsed
+    if SLOW_REQUEST_MS and len(stats.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+        stats.statements.append((elapsed, statement))
+
+def pool_gauges(engine, name: str):
+    def collect():
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return []
+        return [
+            ("groov_db_pool_size", {"engine": name}, pool.size()),
+            ("groov_db_pool_checked_out", {"engine": name}, pool.checkedout()),
+            ("groov_db_pool_overflow", {"engine": name}, pool.overflow()),
+        ]
+    return collect
+
+def log_slow_request(method: str, route: str, status: int, seconds: float, stats: RequestStats):
+    if not SLOW_REQUEST_MS or seconds * 1000 < SLOW_REQUEST_MS:
+        return
+    statements = "\n".join(f"  {elapsed * 1000:.1f}ms {sql}" for elapsed, sql in stats.statements)
+    logger.warning(
+        "slow request %s %s %s %.1fms sql=%d (%.1fms)\n%s",
+        method, route, status, seconds * 1000, stats.sql_count, stats.sql_seconds * 1000, statements,
+    )
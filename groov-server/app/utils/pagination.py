@@ -0,0 +1,85 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+from app.database.models import Song
+from app.database.schemas import Song as SongSchema
+from app.utils.images import thumbnail_urls
+
+# 응답 필드명 -> 컬럼 매핑
+SONG_FIELDS = {
+    "id": Song.id,
+    "title": Song.title,
+    "image": Song.image,
+    "fileUrl": Song.file_url,
+    "description": Song.description,
+    "duration": Song.duration,
+    "uploadDate": Song.upload_date,
+    "downloadCount": Song.download_count,
+    "playCount": Song.play_count,
+    "thumbnails": Song.image_key,
+}
+
+# 커서 생성에 항상 필요한 컬럼
+KEYSET_FIELDS = ("id", "uploadDate")
+
+def parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(SONG_FIELDS)
+
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in SONG_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 필드: {', '.join(unknown)}")
+
+    return list(dict.fromkeys(selected))
+
+def song_columns(fields: list[str]):
+    names = list(dict.fromkeys([*KEYSET_FIELDS, *fields]))
+    return [SONG_FIELDS[name].label(name) for name in names]
+
+# schemas.Song 필드에 해당하는 컬럼만 조회 (ORM 객체/관계 로딩 없이 검증 가능)
+def song_schema_columns():
+    return [getattr(Song, name) for name in SongSchema.model_fields]
+
+def encode_cursor(upload_date: datetime, song_id: str) -> str:
+    raw = json.dumps([upload_date.isoformat(), song_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        upload_date, song_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(upload_date), str(song_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다.")
+
+# (upload_date, id) 내림차순 keyset 조건
+def keyset_filter(cursor: str):
+    upload_date, song_id = decode_cursor(cursor)
+    return or_(
+        Song.upload_date < upload_date,
+        and_(Song.upload_date == upload_date, Song.id < song_id),
+    )
+
+def page_rows(rows, limit: int | None):
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].upload_date, rows[-1].id)
+    return rows, None
+
+def keyset_order():
+    return (Song.upload_date.desc(), Song.id.desc())
+
+def serialize_song_row(row, fields: list[str]) -> dict:
+    data = {}
+    for name in fields:
+        value = getattr(row, name)
+        if name == "uploadDate":
+            value = value.strftime("%Y-%m-%d")
+        elif name == "thumbnails":
+            value = thumbnail_urls(row.id, value)
+        data[name] = value
+    return data
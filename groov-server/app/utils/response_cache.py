@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from fastapi import Request, Response
+
+from app.utils.http_cache import is_not_modified
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 2048))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 30))
+RESPONSE_CACHE_STALE_TTL = float(os.getenv("RESPONSE_CACHE_STALE_TTL", 300))
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    headers: dict[str, str]
+    tags: tuple[str, ...]
+    fresh_until: float
+    stale_until: float
+    media_type: str = "application/json"
+    created_at: float = field(default_factory=time.monotonic)
+
+# 공유 캐시(Redis 등)로 바꿀 수 있도록 저장소는 이 인터페이스만 구현하면 된다.
+class CacheBackend:
+    def get(self, key: str) -> CacheEntry | None:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CacheEntry):
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class InMemoryBackend(CacheBackend):
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend | None = None, ttl: float = RESPONSE_CACHE_TTL, stale_ttl: float = RESPONSE_CACHE_STALE_TTL):
+        self.backend = backend or InMemoryBackend()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._generations: dict[str, int] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(request: Request, scope: str = "") -> str:
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        return f"{request.url.path}?{query}#{scope}"
+
+    def _generation(self, tags) -> tuple[int, ...]:
+        return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    # compute 는 (body, headers) 를 반환하는 비동기 함수. 요청 세션에 의존하지 않아야 한다.
+    # headers 의 ETag 는 캐시 적중 시 조건부 요청(304) 판단에 그대로 쓴다.
+    async def get_or_compute(self, key: str, tags: tuple[str, ...], compute) -> CacheEntry:
+        now = time.monotonic()
+        entry = self.backend.get(key)
+        if entry is not None and now < entry.fresh_until:
+            self.hits += 1
+            return entry
+        if entry is not None and now < entry.stale_until:
+            # 오래된 응답을 즉시 돌려주고 갱신은 한 번만 백그라운드에서 수행한다.
+            self.stale_hits += 1
+            if key not in self._inflight:
+                self._start(key, tags, compute).add_done_callback(_ignore_result)
+            return entry
+
+        self.misses += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        return await self._start(key, tags, compute)
+
+    def _start(self, key: str, tags: tuple[str, ...], compute) -> asyncio.Future:
+        future = asyncio.ensure_future(self._compute(key, tags, compute))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.get(key) is future and self._inflight.pop(key))
+        return future
+
+    async def _compute(self, key: str, tags: tuple[str, ...], compute) -> CacheEntry:
+        generation = self._generation(tags)
+        body, headers = await compute()
+        now = time.monotonic()
+        entry = CacheEntry(
+            body=body,
+            headers=headers,
+            tags=tags,
+            fresh_until=now + self.ttl,
+            stale_until=now + self.ttl + self.stale_ttl,
+        )
+        # 계산 도중 무효화가 일어났으면 결과는 돌려주되 저장하지 않는다.
+        if generation == self._generation(tags):
+            self.backend.set(key, entry)
+        return entry
+
+    # 진행 중인 계산은 무효화 이전 데이터일 수 있으므로 이후 요청이 합류하지 않게 끊어낸다.
+    def invalidate(self, *tags: str):
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+        self.backend.invalidate_tags(tags)
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "staleHits": self.stale_hits,
+            "misses": self.misses,
+            "hitRatio": (self.hits + self.stale_hits) / total if total else 0.0,
+        }
+
+def _ignore_result(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("background cache refresh failed: %r", future.exception())
+
+def cached_response(request: Request, entry: CacheEntry) -> Response:
+    etag = entry.headers.get("ETag")
+    if etag and is_not_modified(request, etag):
+        return Response(status_code=304, headers=entry.headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=entry.headers)
+
+response_cache = ResponseCache()
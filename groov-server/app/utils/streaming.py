@@ -0,0 +1,96 @@
+import os
+from datetime import datetime
+from pathlib import Path
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.http_cache import http_date
+from app.utils.metrics import metrics
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 단일 구간 "bytes=start-end" 만 지원한다. 다중 구간이나 해석 불가능한 값은 None (전체 응답).
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    start_text, end_text = (part.strip() for part in spec.split("-", 1))
+    try:
+        if start_text == "":
+            length = int(end_text)
+            if length <= 0:
+                raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="요청 범위가 잘못되었습니다.", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+def file_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+async def _iter_file(path: Path, start: int, end: int):
+    f = await run_in_threadpool(path.open, "rb")
+    try:
+        await run_in_threadpool(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await run_in_threadpool(f.read, min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            metrics.add_bytes("download", len(chunk))
+            yield chunk
+    finally:
+        await run_in_threadpool(f.close)
+
+async def ranged_file_response(
+    request: Request,
+    path: Path,
+    media_type: str,
+    headers: dict | None = None,
+) -> Response:
+    try:
+        stat = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+
+    size = stat.st_size
+    etag = file_etag(stat)
+    response_headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": http_date(datetime.fromtimestamp(stat.st_mtime)),
+        **(headers or {}),
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=response_headers)
+
+    byte_range = parse_range(request.headers.get("range"), size)
+    # If-Range 가 현재 ETag 와 다르면 파일이 바뀐 것이므로 전체를 내려준다.
+    if_range = request.headers.get("if-range")
+    if byte_range and if_range and if_range != etag:
+        byte_range = None
+
+    if byte_range is None:
+        response_headers["Content-Length"] = str(size)
+        return StreamingResponse(_iter_file(path, 0, size - 1), media_type=media_type, headers=response_headers)
+
+    start, end = byte_range
+    response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response_headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_file(path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=response_headers,
+    )
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import FormData, Headers
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from app.utils.metrics import metrics
+
+CHUNK_SIZE = 1024 * 1024
+MAX_AUDIO_SIZE = int(os.getenv("MAX_AUDIO_SIZE", 50 * 1024 * 1024))
+MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_SIZE", 10 * 1024 * 1024))
+BATCH_UPLOAD_MAX_TRACKS = int(os.getenv("BATCH_UPLOAD_MAX_TRACKS", 30))
+# 멀티파트 경계·폼 필드 등 파일 외 부분의 여유분
+MULTIPART_OVERHEAD = 64 * 1024
+
+@dataclass
+class StagedFile:
+    path: Path
+    size: int
+    sha256: str
+
+    def discard(self):
+        self.path.unlink(missing_ok=True)
+
+def _open_temp(tmp_dir: Path, suffix: str):
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=tmp_dir, suffix=suffix + ".part")
+    return os.fdopen(fd, "w+b"), Path(name)
+
+# 업로드 파트를 tmp_dir 의 이름 있는 파일에 바로 쓰면서 크기와 해시를 센다.
+# stage_upload 가 넘겨받기 전에 닫히면(파싱 오류, 요청 종료) 파일을 지운다.
+class SpoolFile:
+    def __init__(self, tmp_dir: Path, suffix: str):
+        self.file, self.path = _open_temp(tmp_dir, suffix)
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.claimed = False
+
+    def write(self, data: bytes) -> int:
+        self.digest.update(data)
+        self.size += len(data)
+        metrics.add_bytes("upload", len(data))
+        return self.file.write(data)
+
+    def close(self):
+        self.file.close()
+        if not self.claimed:
+            self.path.unlink(missing_ok=True)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+# Starlette 기본 파서는 파일 파트를 SpooledTemporaryFile(이름 없는 임시 파일)에 받으므로
+# 옮길 수 없어 한 번 더 복사해야 한다. 파일 파트만 SpoolFile 로 받는다.
+class StagingMultiPartParser(MultiPartParser):
+    def __init__(self, *args, tmp_dir: Path, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tmp_dir = tmp_dir
+
+    def on_headers_finished(self) -> None:
+        super().on_headers_finished()
+        upload = self._current_part.file
+        if upload is not None:
+            self._files_to_close_on_error.pop().close()
+            upload.file = SpoolFile(self.tmp_dir, os.path.splitext(upload.filename or "")[1])
+            self._files_to_close_on_error.append(upload.file)
+
+class StagingRequest(Request):
+    async def _get_form(self, *, max_files: int | float = 1000, max_fields: int | float = 1000) -> FormData:
+        if self._form is None and self.headers.get("content-type", "").startswith("multipart/form-data"):
+            parser = StagingMultiPartParser(
+                self.headers, self.stream(), max_files=max_files, max_fields=max_fields,
+                tmp_dir=self.app.state.settings.upload_tmp_dir,
+            )
+            try:
+                self._form = await parser.parse()
+            except MultiPartException as exc:
+                raise HTTPException(status_code=400, detail=exc.message)
+        return await super()._get_form(max_files=max_files, max_fields=max_fields)
+
+# 업로드 라우트용: 멀티파트 파일 파트를 수신하면서 upload_tmp_dir 에 바로 기록한다.
+class StagingRoute(APIRoute):
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def staging_handler(request: Request):
+            return await handler(StagingRequest(request.scope, request.receive))
+
+        return staging_handler
+
+def _too_large_file(upload: UploadFile, max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"파일 크기가 너무 큽니다: {upload.filename} (최대 {max_size // (1024 * 1024)}MB)",
+    )
+
+# StagingRoute 가 이미 tmp_dir 에 기록한 파일을 그대로 넘겨받는다 (바이트당 디스크 쓰기 한 번).
+# 본문 크기 상한은 수신 중에 UploadSizeLimitMiddleware 가 강제하며, max_size 는 파일별 크기 확인일 뿐이다.
+# 기본 파서로 받은 UploadFile 은 청크 단위로 tmp_dir 에 복사한다.
+async def stage_upload(upload: UploadFile, tmp_dir: Path, max_size: int) -> StagedFile:
+    spool = upload.file
+    if isinstance(spool, SpoolFile):
+        spool.claimed = True
+        await run_in_threadpool(spool.file.close)
+        staged = StagedFile(path=spool.path, size=spool.size, sha256=spool.digest.hexdigest())
+        if staged.size > max_size:
+            staged.discard()
+            raise _too_large_file(upload, max_size)
+    else:
+        staged = await _copy_upload(upload, tmp_dir, max_size)
+
+    if staged.size == 0:
+        staged.discard()
+        raise HTTPException(status_code=400, detail=f"빈 파일입니다: {upload.filename}")
+    return staged
+
+async def _copy_upload(upload: UploadFile, tmp_dir: Path, max_size: int) -> StagedFile:
+    suffix = os.path.splitext(upload.filename or "")[1]
+    buffer, path = await run_in_threadpool(_open_temp, tmp_dir, suffix)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise _too_large_file(upload, max_size)
+            digest.update(chunk)
+            await run_in_threadpool(buffer.write, chunk)
+            metrics.add_bytes("upload", len(chunk))
+        await run_in_threadpool(buffer.close)
+    except BaseException:
+        buffer.close()
+        path.unlink(missing_ok=True)
+        raise
+
+    return StagedFile(path=path, size=size, sha256=digest.hexdigest())
+
+def _looks_like_mp3(path: Path) -> bool:
+    with path.open("rb") as f:
+        header = f.read(3)
+    return header == b"ID3" or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0)
+
+# 전체 파싱은 백그라운드 작업에서 하고, 요청 경로에서는 헤더만 확인한다.
+async def looks_like_mp3(staged: StagedFile) -> bool:
+    return await run_in_threadpool(_looks_like_mp3, staged.path)
+
+# 업로드 라우트별 요청 본문 상한 (None 이면 제한하지 않음)
+def upload_body_limit(method: str, path: str) -> int | None:
+    if method == "POST" and path == "/upload":
+        return MAX_AUDIO_SIZE + MAX_IMAGE_SIZE + MULTIPART_OVERHEAD
+    if method == "POST" and path == "/upload/batch":
+        return BATCH_UPLOAD_MAX_TRACKS * (MAX_AUDIO_SIZE + MAX_IMAGE_SIZE) + MULTIPART_OVERHEAD
+    if method == "PUT" and path.startswith("/song/"):
+        return MAX_IMAGE_SIZE + MULTIPART_OVERHEAD
+    return None
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"요청 본문이 너무 큽니다. (최대 {limit // (1024 * 1024)}MB)")
+
+# 업로드 크기 상한은 여기서 강제한다. 멀티파트 파싱은 핸들러보다 먼저 본문 전체를 받아 두므로,
+# Content-Length 가 상한을 넘으면 바로 거절하고, 수신 중에 상한을 넘으면 그 자리에서 끊는다.
+class UploadSizeLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = upload_body_limit(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            error = _too_large(limit)
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,52 @@
+import os
+import struct
+
+WAVEFORM_SAMPLE_RATE = int(os.getenv("WAVEFORM_SAMPLE_RATE", 8000))
+WAVEFORM_LEVELS = [int(level) for level in os.getenv("WAVEFORM_LEVELS", "256,1024,4096").split(",") if level.strip()]
+
+# 파일 형식 (little-endian)
+#   header: magic "GRWF", version u8, level 수 u8, sample_rate u32, duration(ms) u32
+#   level : bins u32 + bins 개의 (min int8, max int8) 쌍
+WAVEFORM_MAGIC = b"GRWF"
+WAVEFORM_VERSION = 1
+HEADER = struct.Struct("<4sBBII")
+LEVEL_HEADER = struct.Struct("<I")
+
+def compute_peaks(samples, bins: int):
+    import numpy as np
+
+    bins = max(1, min(bins, len(samples)))
+    if len(samples) == 0:
+        return np.zeros((1, 2), dtype=np.int8)
+
+    edges = np.linspace(0, len(samples), bins + 1).astype(np.int64)[:-1]
+    minimum = np.minimum.reduceat(samples, edges)
+    maximum = np.maximum.reduceat(samples, edges)
+    peaks = np.stack([minimum, maximum], axis=1).astype(np.float32)
+    return np.clip(np.round(peaks / 32768 * 127), -127, 127).astype(np.int8)
+
+def encode_waveform(samples, sample_rate: int = WAVEFORM_SAMPLE_RATE, levels=WAVEFORM_LEVELS) -> bytes:
+    duration_ms = int(len(samples) * 1000 / sample_rate)
+    parts = [HEADER.pack(WAVEFORM_MAGIC, WAVEFORM_VERSION, len(levels), sample_rate, duration_ms)]
+    for bins in levels:
+        peaks = compute_peaks(samples, bins)
+        parts.append(LEVEL_HEADER.pack(len(peaks)))
+        parts.append(peaks.tobytes())
+    return b"".join(parts)
+
+# level 번째 해상도의 (min, max) 바이트열과 bin 수를 돌려준다.
+def read_level(data: bytes, level: int) -> tuple[bytes, int]:
+    magic, version, level_count, _, _ = HEADER.unpack_from(data, 0)
+    if magic != WAVEFORM_MAGIC or version != WAVEFORM_VERSION:
+        raise ValueError("invalid waveform file")
+    if not 0 <= level < level_count:
+        raise IndexError(level)
+
+    offset = HEADER.size
+    for index in range(level_count):
+        (bins,) = LEVEL_HEADER.unpack_from(data, offset)
+        offset += LEVEL_HEADER.size
+        if index == level:
+            return data[offset:offset + bins * 2], bins
+        offset += bins * 2
+    raise IndexError(level)
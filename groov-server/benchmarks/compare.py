@@ -0,0 +1,33 @@
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("throughput", "p50_ms", "p95_ms", "p99_ms")
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark results")
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    args = parser.parse_args()
+
+    before = json.loads(args.before.read_text())
+    after = json.loads(args.after.read_text())
+
+    print(f"{'endpoint':<32}" + "".join(f"{metric:>22}" for metric in METRICS))
+    for label in sorted(set(before["endpoints"]) | set(after["endpoints"])):
+        old = before["endpoints"].get(label, {})
+        new = after["endpoints"].get(label, {})
+        cells = []
+        for metric in METRICS:
+            a, b = old.get(metric, 0.0), new.get(metric, 0.0)
+            cells.append(f"{a:>8.1f} → {b:>7.1f} {change(a, b):>4}")
+        print(f"{label:<32}" + "".join(f"{cell:>22}" for cell in cells))
+    print(f"{'total throughput':<32}{before['throughput']:>8.1f} → {after['throughput']:.1f} {change(before['throughput'], after['throughput'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import json
+import random
+import struct
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 128kbps / 44.1kHz MPEG-1 Layer III 무음 프레임 (mutagen 이 길이를 계산할 수 있는 최소 형태)
+MP3_FRAME_HEADER = bytes([0xFF, 0xFB, 0x90, 0x64])
+MP3_FRAME_SIZE = 417
+MP3_FRAMES_PER_SECOND = 38.28
+
+TITLE_WORDS = [
+    "봄날", "밤편지", "사랑", "여름", "별", "바다", "너의", "우리", "하루", "꿈",
+    "Love", "Night", "Dream", "Blue", "Summer", "Dive", "Moon", "City", "Heart", "Road",
+]
+
+def silent_mp3(seconds: float = 3.0) -> bytes:
+    frame = MP3_FRAME_HEADER + bytes(MP3_FRAME_SIZE - len(MP3_FRAME_HEADER))
+    return frame * max(1, int(seconds * MP3_FRAMES_PER_SECOND))
+
+def tiny_png(size: int = 8, color=(120, 80, 200)) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    row = b"\x00" + bytes(color) * size
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * size))
+        + chunk(b"IEND", b"")
+    )
+
+def random_title(rng: random.Random) -> str:
+    return " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 2)))[:20]
+
+# users/songs/user_downloads 를 직접 채운다. 오디오 파일은 다운로드 시나리오용으로 하나만 만들어 공유한다.
+def seed_catalog(database_url: str, media_root: Path, users: int, songs: int, downloads_per_user: int, seed: int = 0) -> dict:
+    from sqlalchemy import create_engine, insert
+    from app.database.database import Base
+    from app.database.models import User, Song, user_downloads
+
+    rng = random.Random(seed)
+    audio_dir = media_root / "audio"
+    image_dir = media_root / "image"
+    audio_dir.mkdir(parents=True, exist_ok=True)
+    image_dir.mkdir(parents=True, exist_ok=True)
+    (audio_dir / "bench.mp3").write_bytes(silent_mp3())
+    (image_dir / "bench.png").write_bytes(tiny_png())
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+
+    now = datetime.now()
+    user_rows = [
+        {
+            "id": f"bench-user-{i}",
+            "name": f"user{i}"[:10],
+            "image": "",
+            "email": f"user{i}@bench.local",
+            "created_at": now,
+        }
+        for i in range(users)
+    ]
+    song_rows = [
+        {
+            "id": uuid.uuid4().hex[:8],
+            "title": random_title(rng),
+            "image": "/media/image/bench.png",
+            "file_url": "/media/audio/bench.mp3",
+            "upload_date": now - timedelta(seconds=i),
+            "duration": 3.0,
+            "download_count": 0,
+            "play_count": 0,
+            "description": user_rows[i % users]["name"],
+            "owner_id": user_rows[i % users]["id"],
+            "status": "ready",
+        }
+        for i in range(songs)
+    ]
+    edges = {
+        (user["id"], song["id"])
+        for user in user_rows
+        for song in rng.sample(song_rows, min(downloads_per_user, len(song_rows)))
+    }
+
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), user_rows)
+        conn.execute(insert(Song.__table__), song_rows)
+        if edges:
+            conn.execute(insert(user_downloads), [{"user_id": u, "song_id": s} for u, s in edges])
+    engine.dispose()
+
+    owned = {}
+    for user_id, song_id in edges:
+        owned.setdefault(user_id, []).append(song_id)
+    return {
+        "users": [user["id"] for user in user_rows],
+        "songs": [song["id"] for song in song_rows],
+        "titles": [song["title"] for song in song_rows],
+        "owned": owned,
+    }
+
+# 로컬 RSA 키로 구글 ID 토큰을 흉내낸다. 공개키는 GOOGLE_CERTS_FILE 로 서버에 전달한다.
+class FakeGoogleIssuer:
+    def __init__(self, client_id: str, certs_path: Path):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        self.client_id = client_id
+        self.kid = uuid.uuid4().hex
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode()
+        public_pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ).decode()
+        certs_path.write_text(json.dumps({self.kid: public_pem}))
+        self.certs_path = certs_path
+
+    def id_token(self, user_id: str, name: str, email: str) -> str:
+        from jose import jwt
+
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com",
+            "aud": self.client_id,
+            "sub": user_id,
+            "name": name,
+            "email": email,
+            "picture": "",
+            "iat": now,
+            "exp": now + 3600,
+        }
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
@@ -0,0 +1,281 @@
+"""Groov 서버 부하 테스트.
+
+SQLite 와 합성 카탈로그로 app.asgi:app 을 띄우고, 구글 로그인과 카카오페이는 로컬 가짜로 대체한 뒤
+browse / search / play / upload / purchase / download 시나리오를 동시에 실행한다.
+
+    python -m benchmarks.run --users 50 --songs 20000 --concurrency 32 --duration 30 --output result.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.fixtures import FakeGoogleIssuer, seed_catalog, silent_mp3, tiny_png
+
+SERVER_ROOT = Path(__file__).resolve().parent.parent
+SCENARIO_WEIGHTS = {"browse": 40, "search": 30, "play": 20, "download": 15, "purchase": 10, "upload": 5}
+PLAY_EVENTS_PER_BATCH = 50
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[min(len(ordered), max(rank, 1)) - 1]
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(self, session, label: str, method: str, url: str, expect=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                body = await response.read()
+                ok = response.status in expect
+        except Exception:
+            body, ok = b"", False
+        self.latencies[label].append((time.perf_counter() - started) * 1000)
+        if not ok:
+            self.errors[label] += 1
+            return None
+        return json.loads(body) if body and body[:1] in (b"{", b"[") else body
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for label, values in sorted(self.latencies.items()):
+            endpoints[label] = {
+                "count": len(values),
+                "errors": self.errors.get(label, 0),
+                "throughput": len(values) / elapsed,
+                "mean_ms": sum(values) / len(values),
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            "elapsed_s": elapsed,
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput": total / elapsed,
+            "endpoints": endpoints,
+        }
+
+class VirtualUser:
+    def __init__(self, base_url: str, recorder: Recorder, catalog: dict, user_id: str, token: str, rng: random.Random):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.catalog = catalog
+        self.user_id = user_id
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.rng = rng
+
+    async def browse(self, session):
+        cursor = None
+        for _ in range(3):
+            params = {"limit": "20"} | ({"cursor": cursor} if cursor else {})
+            page = await self.recorder.request(session, "GET /songs", "GET", f"{self.base_url}/songs", params=params)
+            cursor = page and page.get("nextCursor")
+            if not cursor:
+                break
+
+    async def search(self, session):
+        title = self.rng.choice(self.catalog["titles"]).replace(" ", "")
+        for length in range(1, len(title) + 1):
+            await self.recorder.request(session, "GET /song", "GET", f"{self.base_url}/song", params={"search": title[:length]})
+
+    async def download(self, session):
+        owned = self.catalog["owned"].get(self.user_id)
+        if not owned:
+            return
+        song_id = self.rng.choice(owned)
+        await self.recorder.request(
+            session, "GET /downloading/{song_id}", "GET", f"{self.base_url}/downloading/{song_id}", headers=self.headers
+        )
+
+    # 클라이언트가 재생 구간을 모아 한 번에 보내는 상황
+    async def play(self, session):
+        events = [
+            {"song_id": self.rng.choice(self.catalog["songs"]), "position": i * 10.0, "listened": 10.0}
+            for i in range(PLAY_EVENTS_PER_BATCH)
+        ]
+        await self.recorder.request(
+            session, "POST /events/play", "POST", f"{self.base_url}/events/play", expect=(202,),
+            headers=self.headers, json={"events": events},
+        )
+
+    async def purchase(self, session):
+        song_id = self.rng.choice(self.catalog["songs"])
+        order_id = f"{uuid.uuid4().hex[:12]}_{song_id}"
+        ready = await self.recorder.request(
+            session, "POST /payment/ready", "POST", f"{self.base_url}/payment/ready", headers=self.headers,
+            json={"order_id": order_id, "user_id": self.user_id, "item_name": "bench"},
+        )
+        if not ready:
+            return
+        await self.recorder.request(
+            session, "POST /payment/approve", "POST", f"{self.base_url}/payment/approve", headers=self.headers,
+            json={"order_id": order_id, "song_id": song_id, "tid": ready["tid"], "pg_token": "bench"},
+        )
+
+    async def upload(self, session):
+        import aiohttp
+
+        form = aiohttp.FormData()
+        form.add_field("title", f"bench {self.rng.randint(0, 9999)}")
+        form.add_field("audio_file", silent_mp3(), filename="bench.mp3", content_type="audio/mpeg")
+        form.add_field("image_file", tiny_png(), filename="bench.png", content_type="image/png")
+        await self.recorder.request(
+            session, "POST /upload", "POST", f"{self.base_url}/upload", expect=(201,), headers=self.headers, data=form
+        )
+
+    async def run(self, session, deadline: float):
+        scenarios, weights = zip(*SCENARIO_WEIGHTS.items())
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(scenarios, weights)[0]
+            await getattr(self, scenario)(session)
+
+def start_server(workdir: Path, args, client_id: str, certs_path: Path) -> tuple[subprocess.Popen, str, dict]:
+    port = free_port()
+    env = os.environ | {
+        "DATABASE_URL": f"sqlite:///{workdir / 'bench.sqlite3'}",
+        "MEDIA_ROOT": str(workdir / "media"),
+        "UPLOAD_TMP_DIR": str(workdir / "tmp"),
+        "JOB_QUEUE_PATH": str(workdir / "jobs.sqlite3"),
+        "TRENDING_PATH": str(workdir / "trending.sqlite3"),
+        "RECOMMEND_PATH": str(workdir / "recommendations.npz"),
+        "EVENT_BROKER_PATH": str(workdir / "events.sqlite3"),
+        "JWT_SECRET_KEY": "bench-secret",
+        "JWT_REFRESH_SECRET_KEY": "bench-refresh-secret",
+        "GOOGLE_CLIENT_ID": client_id,
+        "GOOGLE_CERTS_FILE": str(certs_path),
+        "PAYMENT_GATEWAY": "fake",
+        "REDIRECT_BASE_URL": "http://localhost",
+        "CID": "TC0ONETIME",
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.asgi:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=SERVER_ROOT,
+        env=env,
+    )
+    return process, f"http://127.0.0.1:{port}", env
+
+async def wait_until_ready(base_url: str, timeout: float = 30) -> float:
+    import aiohttp
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        while time.perf_counter() - started < timeout:
+            try:
+                async with session.get(f"{base_url}/songs", params={"limit": "1"}) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+async def drive(base_url: str, catalog: dict, issuer: FakeGoogleIssuer, args) -> dict:
+    import aiohttp
+
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    connector = aiohttp.TCPConnector(limit=args.concurrency * 2)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        users = []
+        for i in range(args.concurrency):
+            user_id = catalog["users"][i % len(catalog["users"])]
+            index = user_id.rsplit("-", 1)[1]
+            id_token = issuer.id_token(user_id, f"user{index}"[:10], f"user{index}@bench.local")
+            login = await recorder.request(session, "POST /user", "POST", f"{base_url}/user", json={"token": id_token})
+            if not login:
+                raise RuntimeError("login failed; check GOOGLE_CERTS_FILE support")
+            users.append(VirtualUser(base_url, recorder, catalog, user_id, login["token"], random.Random(rng.random())))
+
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(user.run(session, deadline) for user in users))
+        return recorder.report(time.monotonic() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Groov server benchmark")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--songs", type=int, default=5000)
+    parser.add_argument("--downloads-per-user", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--keep", action="store_true", help="keep the temporary database and media")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="groov-bench-"))
+    client_id = "groov-bench.apps.googleusercontent.com"
+    issuer = FakeGoogleIssuer(client_id, workdir / "certs.json")
+    sys.path.insert(0, str(SERVER_ROOT))
+
+    process = None
+    try:
+        seeded_at = time.perf_counter()
+        catalog = seed_catalog(
+            f"sqlite:///{workdir / 'bench.sqlite3'}", workdir / "media",
+            args.users, args.songs, args.downloads_per_user, args.seed,
+        )
+        seed_seconds = time.perf_counter() - seeded_at
+
+        process, base_url, _ = start_server(workdir, args, client_id, issuer.certs_path)
+        startup_seconds = asyncio.run(wait_until_ready(base_url))
+        report = asyncio.run(drive(base_url, catalog, issuer, args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "config": vars(args) | {"output": str(args.output) if args.output else None},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "seed_s": seed_seconds,
+        "startup_s": startup_seconds,
+        **report,
+    }
+
+    print(f"{'endpoint':<32}{'count':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for label, stats in result["endpoints"].items():
+        print(
+            f"{label:<32}{stats['count']:>8}{stats['errors']:>6}{stats['throughput']:>9.1f}"
+            f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+        )
+    print(f"total {result['requests']} requests, {result['throughput']:.1f} req/s, {result['errors']} errors")
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Groov 서버 콜드 스타트 측정.
+
+새 인터프리터에서 매번 app.main import, create_app, uvicorn 기동 후 첫 200 응답까지를 잰다.
+
+    python -m benchmarks.startup --repeat 10 --output startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fixtures import FakeGoogleIssuer, seed_catalog
+from benchmarks.run import SERVER_ROOT, percentile, start_server, wait_until_ready
+
+# DATABASE_URL 없이도 import 와 create_app 이 성공해야 한다 (DB 연결은 startup 에서).
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+app.main.create_app()
+print(imported - started, time.perf_counter() - imported)
+"""
+
+def measure_import(workdir: Path) -> tuple[float, float]:
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+    env |= {"MEDIA_ROOT": str(workdir / "media"), "DATA_DIR": str(workdir / "data")}
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=SERVER_ROOT, env=env, check=True, capture_output=True, text=True,
+    ).stdout.split()
+    return float(output[-2]), float(output[-1])
+
+def measure_first_response(workdir: Path, args, issuer: FakeGoogleIssuer) -> float:
+    started = time.perf_counter()
+    process, base_url, _ = start_server(workdir, args, issuer.client_id, issuer.certs_path)
+    try:
+        asyncio.run(wait_until_ready(base_url))
+        return time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def summarize(values: list[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Groov server cold start benchmark")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--songs", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="groov-startup-"))
+    client_id = "groov-bench.apps.googleusercontent.com"
+    issuer = FakeGoogleIssuer(client_id, workdir / "certs.json")
+    sys.path.insert(0, str(SERVER_ROOT))
+
+    samples = {"import": [], "create_app": [], "first_response": []}
+    try:
+        seed_catalog(f"sqlite:///{workdir / 'bench.sqlite3'}", workdir / "media", 10, args.songs, 5, 0)
+        for _ in range(args.repeat):
+            imported, created = measure_import(workdir)
+            samples["import"].append(imported)
+            samples["create_app"].append(created)
+            samples["first_response"].append(measure_first_response(workdir, args, issuer))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "config": vars(args) | {"output": str(args.output) if args.output else None},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "startup": {phase: summarize(values) for phase, values in samples.items()},
+    }
+
+    print(f"{'phase':<16}{'p50':>9}{'p95':>9}{'max':>9}")
+    for phase, stats in result["startup"].items():
+        print(f"{phase:<16}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['max_ms']:>9.1f}")
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
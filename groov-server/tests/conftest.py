@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth import token
+from app.auth.google_auth import google_verifier
+from app.database.database import SessionLocal
+from app.database.models import Song, User
+from app.main import create_app
+from app.settings import Settings
+
+@pytest.fixture
+def settings(tmp_path) -> Settings:
+    return Settings(
+        database_url=f"sqlite:///{tmp_path / 'groov.sqlite3'}",
+        media_root=tmp_path / "media",
+        upload_tmp_dir=tmp_path / "tmp",
+        data_dir=tmp_path / "data",
+        job_queue_path=tmp_path / "data" / "jobs.sqlite3",
+        trending_path=tmp_path / "data" / "trending.sqlite3",
+        recommend_path=tmp_path / "data" / "recommendations.npz",
+        event_broker_path=tmp_path / "data" / "events.sqlite3",
+        create_schema=True,
+        background_tasks=False,
+    )
+
+# 전체 앱을 임시 SQLite 와 미디어 디렉터리로 띄운다. 구글 인증서는 빈 로컬 파일로 대신한다.
+@pytest.fixture
+def client(settings, tmp_path, monkeypatch):
+    certs = tmp_path / "certs.json"
+    certs.write_text("{}")
+    monkeypatch.setattr(google_verifier, "certs_file", str(certs))
+    monkeypatch.setattr(token, "JWT_SECRET_KEY", "test-secret")
+
+    with TestClient(create_app(settings)) as client:
+        yield client
+
+def auth_headers(user_id: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token.create_access_token({'sub': user_id})}"}
+
+def add_user(user_id: str) -> User:
+    with SessionLocal() as db:
+        user = User(id=user_id, name=user_id[:10], image="i", email=f"{user_id}@example.com")
+        db.add(user)
+        db.commit()
+        return user
+
+def add_song(song_id: str, owner_id: str | None = None, file_url: str = "f", image: str = "i") -> Song:
+    with SessionLocal() as db:
+        song = Song(
+            id=song_id, title=song_id, image=image, file_url=file_url, duration=0,
+            description="d", owner_id=owner_id, status="ready",
+        )
+        db.add(song)
+        db.commit()
+        return song
@@ -0,0 +1,45 @@
+import pytest
+
+from app.database.database import SessionLocal
+from app.database.models import Song
+from app.storage.media_store import media_store
+
+from tests.conftest import add_song, add_user, auth_headers
+
+def write_outputs(settings, song_id: str):
+    (settings.hls_dir / song_id).mkdir(parents=True)
+    (settings.thumb_dir / song_id).mkdir(parents=True)
+    settings.waveform_dir.mkdir(parents=True, exist_ok=True)
+    (settings.waveform_dir / f"{song_id}.bin").write_bytes(b"w")
+
+def outputs_exist(settings, song_id: str) -> list[bool]:
+    return [
+        (settings.hls_dir / song_id).exists(),
+        (settings.thumb_dir / song_id).exists(),
+        (settings.waveform_dir / f"{song_id}.bin").exists(),
+    ]
+
+def test_delete_song_removes_derived_outputs(client, settings):
+    add_user("ds-owner")
+    add_song("ds-song", owner_id="ds-owner")
+    write_outputs(settings, "ds-song")
+
+    response = client.delete("/song/ds-song", headers=auth_headers("ds-owner"))
+    assert response.status_code == 200
+    assert outputs_exist(settings, "ds-song") == [False, False, False]
+
+def test_failed_delete_keeps_derived_outputs(client, settings, monkeypatch):
+    add_user("ds-owner2")
+    add_song("ds-song2", owner_id="ds-owner2")
+    write_outputs(settings, "ds-song2")
+
+    def fail(db, url):
+        raise RuntimeError("release failed")
+    monkeypatch.setattr(media_store, "release", fail)
+
+    with pytest.raises(RuntimeError):
+        client.delete("/song/ds-song2", headers=auth_headers("ds-owner2"))
+
+    with SessionLocal() as db:
+        assert db.get(Song, "ds-song2") is not None
+    assert outputs_exist(settings, "ds-song2") == [True, True, True]
@@ -0,0 +1,24 @@
+from app.analytics.counters import counters
+from app.analytics.trending import trending
+
+from tests.conftest import add_song, add_user, auth_headers
+
+def charted(song_id: str) -> bool:
+    return any(entry["songId"] == song_id for entry in trending.chart("all-time"))
+
+def test_delete_user_drops_songs_from_trending_and_counters(client):
+    add_user("leaving")
+    add_song("du-song", owner_id="leaving")
+    trending.record("du-song", "purchase")
+    client.portal.call(trending.flush)
+    trending.record("du-song", "download")
+    counters.record("du-song", "download_count")
+    assert charted("du-song")
+
+    response = client.delete("/delete", headers=auth_headers("leaving"))
+    assert response.status_code == 200
+
+    assert not charted("du-song")
+    assert counters.pending("du-song") == {}
+    client.portal.call(trending.flush)
+    assert not charted("du-song")
@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import insert
+
+from app.analytics.counters import counters
+from app.database.database import SessionLocal
+from app.database.models import user_downloads
+from app.storage.media_store import media_store
+
+from tests.conftest import add_song, add_user, auth_headers
+
+@pytest.fixture
+def purchased(client, settings):
+    add_user("buyer")
+    audio = settings.media_root / "audio" / "song.mp3"
+    audio.parent.mkdir(parents=True)
+    audio.write_bytes(b"ID3" + b"x" * 97)
+    add_song("dl-ok", file_url=media_store.url_for("audio/song.mp3"))
+    add_song("dl-missing", file_url=media_store.url_for("audio/missing.mp3"))
+    with SessionLocal() as db:
+        db.execute(insert(user_downloads), [
+            {"user_id": "buyer", "song_id": "dl-ok"},
+            {"user_id": "buyer", "song_id": "dl-missing"},
+        ])
+        db.commit()
+    return auth_headers("buyer")
+
+def downloads(song_id: str) -> int:
+    return counters.pending(song_id)["download_count"]
+
+def test_full_download_is_counted(client, purchased):
+    response = client.get("/downloading/dl-ok", headers=purchased)
+    assert response.status_code == 200
+    assert downloads("dl-ok") == 1
+
+def test_only_first_range_is_counted(client, purchased):
+    assert client.get("/downloading/dl-ok", headers=purchased | {"Range": "bytes=0-9"}).status_code == 206
+    assert client.get("/downloading/dl-ok", headers=purchased | {"Range": "bytes=10-19"}).status_code == 206
+    assert downloads("dl-ok") == 1
+
+def test_failed_downloads_are_not_counted(client, purchased):
+    assert client.get("/downloading/dl-missing", headers=purchased).status_code == 404
+    assert client.get("/downloading/dl-ok", headers=purchased | {"Range": "bytes=500-"}).status_code == 416
+    assert downloads("dl-missing") == 0
+    assert downloads("dl-ok") == 0
@@ -0,0 +1,78 @@
+import hashlib
+from datetime import datetime, timedelta
+
+from app.database.database import SessionLocal
+from app.database.models import MediaBlob, Payment
+from app.maintenance.gc import GarbageCollector, PAYMENT_READY_TTL
+from app.storage.media_store import media_store
+
+from tests.conftest import add_song, add_user
+
+def put_blob(kind: str, data: bytes, refcount: int | None = None) -> str:
+    key = media_store.key_for(kind, hashlib.sha256(data).hexdigest(), "x.bin")
+    path = media_store.backend.local_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if refcount is not None:
+        with SessionLocal() as db:
+            db.add(MediaBlob(key=key, size=len(data), refcount=refcount))
+            db.commit()
+    return key
+
+def collector(settings) -> GarbageCollector:
+    return GarbageCollector(
+        media_store, [settings.hls_dir, settings.thumb_dir], settings.waveform_dir, settings.upload_tmp_dir, min_age=0
+    )
+
+def test_gc_removes_only_unreferenced_media(client, settings):
+    referenced = put_blob("audio", b"gc referenced", refcount=1)
+    add_song("gc-song", file_url=media_store.url_for(referenced))
+    in_flight = put_blob("audio", b"gc in flight", refcount=1)
+    released = put_blob("image", b"gc released", refcount=0)
+    stray = put_blob("image", b"gc stray")
+
+    report = collector(settings).collect()
+
+    assert media_store.backend.exists(referenced)
+    # 참조 수가 남은 blob 은 아직 곡 행이 커밋되지 않은 업로드일 수 있으므로 남긴다.
+    assert media_store.backend.exists(in_flight)
+    assert not media_store.backend.exists(released)
+    assert not media_store.backend.exists(stray)
+    assert report["image_files"] == 2 and report["audio_files"] == 0
+    with SessionLocal() as db:
+        assert db.get(MediaBlob, released) is None
+        assert db.get(MediaBlob, in_flight).refcount == 1
+
+def test_gc_removes_outputs_of_deleted_songs(client, settings):
+    add_song("gc-live")
+    for song_id in ("gc-live", "gc-gone"):
+        (settings.hls_dir / song_id).mkdir(parents=True)
+        (settings.hls_dir / song_id / "index.m3u8").write_text("#EXTM3U")
+    settings.waveform_dir.mkdir(parents=True, exist_ok=True)
+    (settings.waveform_dir / "gc-gone.bin").write_bytes(b"w")
+
+    report = collector(settings).collect()
+
+    assert (settings.hls_dir / "gc-live").exists()
+    assert not (settings.hls_dir / "gc-gone").exists()
+    assert not (settings.waveform_dir / "gc-gone.bin").exists()
+    assert report["song_outputs"] == 2
+
+def test_gc_expires_stale_ready_payments(client, settings):
+    add_user("gc-buyer")
+    add_song("gc-paid")
+    with SessionLocal() as db:
+        stale = Payment(
+            order_id="gc-stale", tid="gc-t1", user_id="gc-buyer", song_id="gc-paid", status="READY",
+            created_at=datetime.now() - timedelta(seconds=PAYMENT_READY_TTL + 60),
+        )
+        fresh = Payment(order_id="gc-fresh", tid="gc-t2", user_id="gc-buyer", song_id="gc-paid", status="READY")
+        db.add_all([stale, fresh])
+        db.commit()
+        ids = stale.id, fresh.id
+
+    collector(settings).collect()
+
+    with SessionLocal() as db:
+        assert db.get(Payment, ids[0]).status == "EXPIRED"
+        assert db.get(Payment, ids[1]).status == "READY"
@@ -0,0 +1,29 @@
+import asyncio
+
+from PIL import Image
+
+from app.jobs.queue import JobQueue
+from app.jobs.tasks import run_task
+from app.jobs.worker import JobWorker
+
+def test_media_tasks_run_in_spawned_processes(tmp_path):
+    image_path = tmp_path / "cover.png"
+    Image.new("RGB", (32, 32), "red").save(image_path)
+    payload = {
+        "song_id": "s1", "image_path": str(image_path), "image_url": "/media/cover.png",
+        "output_dir": str(tmp_path / "thumbs"), "image_key": "abc", "owner_id": "u1",
+    }
+
+    async def run():
+        worker = JobWorker(JobQueue(tmp_path / "jobs.sqlite3"), max_workers=1)
+        await worker.start()
+        try:
+            assert worker._pool._mp_context.get_start_method() == "spawn"
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(worker._pool, run_task, "image_variants", payload)
+        finally:
+            await worker.stop()
+
+    result = asyncio.run(run())
+    assert result["image_key"] == "abc"
+    assert any((tmp_path / "thumbs").iterdir())
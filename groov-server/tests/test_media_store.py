@@ -0,0 +1,93 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from app.database.database import SessionLocal
+from app.database.models import MediaBlob, Song
+from app.storage.media_store import media_store
+from app.utils.upload import StagedFile
+
+from tests.conftest import add_user, auth_headers
+
+def stage(settings, data: bytes) -> StagedFile:
+    settings.upload_tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=settings.upload_tmp_dir, suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return StagedFile(path=Path(name), size=len(data), sha256=hashlib.sha256(data).hexdigest())
+
+# 업로드 라우트처럼 media_store.add 로 blob 을 참조하는 곡을 만든다.
+def store_song(settings, song_id: str, owner_id: str, audio: bytes, image: bytes) -> Song:
+    with SessionLocal() as db:
+        song = Song(
+            id=song_id, title=song_id, duration=0, description="d", owner_id=owner_id, status="ready",
+            file_url=media_store.url_for(media_store.add(db, "audio", stage(settings, audio), "a.mp3")),
+            image=media_store.url_for(media_store.add(db, "image", stage(settings, image), "c.jpg")),
+        )
+        db.add(song)
+        db.commit()
+        db.refresh(song)
+        return song
+
+def refcount(url: str) -> int | None:
+    with SessionLocal() as db:
+        blob = db.get(MediaBlob, media_store.key_from_url(url))
+        return blob.refcount if blob else None
+
+def test_shared_blob_is_kept_until_last_song_is_deleted(client, settings):
+    add_user("ms-owner")
+    first = store_song(settings, "ms-first", "ms-owner", b"same audio", b"same cover")
+    second = store_song(settings, "ms-second", "ms-owner", b"same audio", b"same cover")
+    assert (first.file_url, first.image) == (second.file_url, second.image)
+    assert refcount(first.file_url) == 2
+    assert list(settings.upload_tmp_dir.iterdir()) == []
+
+    assert client.delete("/song/ms-first", headers=auth_headers("ms-owner")).status_code == 200
+    assert refcount(first.file_url) == 1
+    assert media_store.local_path(first.file_url).exists()
+    assert media_store.local_path(first.image).exists()
+
+    assert client.delete("/song/ms-second", headers=auth_headers("ms-owner")).status_code == 200
+    assert refcount(first.file_url) is None
+    assert not media_store.local_path(first.file_url).exists()
+    assert not media_store.local_path(first.image).exists()
+
+def test_edit_song_releases_replaced_cover(client, settings):
+    add_user("ms-editor")
+    song = store_song(settings, "ms-edit", "ms-editor", b"edit audio", b"old cover")
+    shared = store_song(settings, "ms-shared", "ms-editor", b"shared audio", b"shared cover")
+    old_image = song.image
+
+    response = client.put("/song/ms-edit", data={"title": "new"}, files={"image_file": ("n.jpg", b"new cover")})
+    assert response.status_code == 200
+    with SessionLocal() as db:
+        new_image = db.get(Song, "ms-edit").image
+    assert new_image != old_image
+    assert refcount(old_image) is None
+    assert not media_store.local_path(old_image).exists()
+    assert refcount(new_image) == 1
+    assert media_store.local_path(new_image).exists()
+
+    # 다른 곡과 공유하던 커버로 바꾸고 다시 교체해도 그 곡의 커버는 남는다.
+    response = client.put("/song/ms-edit", data={"title": "new"}, files={"image_file": ("s.jpg", b"shared cover")})
+    assert response.status_code == 200
+    assert not media_store.local_path(new_image).exists()
+    assert refcount(shared.image) == 2
+    response = client.put("/song/ms-edit", data={"title": "new"}, files={"image_file": ("o.jpg", b"other cover")})
+    assert response.status_code == 200
+    assert refcount(shared.image) == 1
+    assert media_store.local_path(shared.image).exists()
+
+def test_delete_user_collects_unshared_blobs(client, settings):
+    add_user("ms-leaving")
+    add_user("ms-staying")
+    own = store_song(settings, "ms-own", "ms-leaving", b"own audio", b"common cover")
+    kept = store_song(settings, "ms-kept", "ms-staying", b"kept audio", b"common cover")
+
+    assert client.delete("/delete", headers=auth_headers("ms-leaving")).status_code == 200
+    assert refcount(own.file_url) is None
+    assert not media_store.local_path(own.file_url).exists()
+    assert refcount(kept.image) == 1
+    assert media_store.local_path(kept.image).exists()
+    assert media_store.local_path(kept.file_url).exists()
@@ -0,0 +1,157 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app import main
+from app.analytics.trending import trending
+from app.database.database import SessionLocal
+from app.database.models import Payment, user_downloads
+from app.payment.gateway import CircuitBreaker, GatewayError, GatewayUnavailable, KakaoPayGateway
+
+from tests.conftest import add_song, add_user, auth_headers
+
+# HTTP 대신 정해 둔 결과를 돌려주는 게이트웨이. 동시 승인 합치기는 KakaoPayGateway 것을 그대로 쓴다.
+class ScriptedGateway(KakaoPayGateway):
+    def __init__(self):
+        super().__init__(base_url="http://gateway.invalid", secret_key="test")
+        self.calls = 0
+        self.error: Exception | None = None
+        self.latency = 0.0
+
+    async def _approve(self, data: dict) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return {"tid": data["tid"]}
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gateway = ScriptedGateway()
+    monkeypatch.setattr(main, "payment_gateway", gateway)
+    return gateway
+
+@pytest.fixture
+def purchases(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(trending, "record", lambda song_id, kind: recorded.append((song_id, kind)))
+    return recorded
+
+def ready_payment(user_id: str, song_id: str) -> dict:
+    add_user(user_id)
+    add_song(song_id)
+    with SessionLocal() as db:
+        db.add(Payment(order_id=f"o_{song_id}", user_id=user_id, song_id=song_id, tid=f"t-{song_id}", status="READY"))
+        db.commit()
+    return {"order_id": f"o_{song_id}", "song_id": song_id, "tid": f"t-{song_id}", "pg_token": "pg"}
+
+def payment_status(tid: str) -> str:
+    with SessionLocal() as db:
+        return db.scalar(select(Payment.status).where(Payment.tid == tid))
+
+def downloads(user_id: str) -> list[str]:
+    with SessionLocal() as db:
+        return list(db.scalars(select(user_downloads.c.song_id).where(user_downloads.c.user_id == user_id)))
+
+def test_repeated_approve_charges_and_counts_once(client, gateway, purchases):
+    body = ready_payment("pay-repeat", "pay-song1")
+
+    for _ in range(2):
+        response = client.post("/payment/approve", json=body, headers=auth_headers("pay-repeat"))
+        assert response.status_code == 200
+
+    assert gateway.calls == 1
+    assert payment_status(body["tid"]) == "COMPLETED"
+    assert downloads("pay-repeat") == ["pay-song1"]
+    assert purchases == [("pay-song1", "purchase")]
+
+def test_declined_approve_returns_to_ready(client, gateway, purchases):
+    body = ready_payment("pay-declined", "pay-song2")
+    gateway.error = GatewayError(400, {"error_code": -780})
+
+    response = client.post("/payment/approve", json=body, headers=auth_headers("pay-declined"))
+    assert response.status_code == 400
+    assert payment_status(body["tid"]) == "READY"
+    assert downloads("pay-declined") == []
+
+def test_ambiguous_approve_stays_approving_until_retried(client, gateway, purchases):
+    body = ready_payment("pay-retry", "pay-song3")
+    gateway.error = GatewayUnavailable("timeout")
+
+    response = client.post("/payment/approve", json=body, headers=auth_headers("pay-retry"))
+    assert response.status_code == 503
+    assert payment_status(body["tid"]) == "APPROVING"
+
+    gateway.error = None
+    response = client.post("/payment/approve", json=body, headers=auth_headers("pay-retry"))
+    assert response.status_code == 200
+    assert payment_status(body["tid"]) == "COMPLETED"
+    assert downloads("pay-retry") == ["pay-song3"]
+    assert purchases == [("pay-song3", "purchase")]
+
+def test_concurrent_approve_is_coalesced(client, gateway, purchases):
+    body = ready_payment("pay-concurrent", "pay-song4")
+    gateway.latency = 0.05
+
+    async def approve_together():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(
+                http.post("/payment/approve", json=body, headers=auth_headers("pay-concurrent")) for _ in range(3)
+            ))
+
+    responses = client.portal.call(approve_together)
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert gateway.calls == 1
+    assert payment_status(body["tid"]) == "COMPLETED"
+    assert downloads("pay-concurrent") == ["pay-song4"]
+    assert purchases == [("pay-song4", "purchase")]
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(GatewayUnavailable):
+        breaker.before_call()
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 30
+    assert breaker.state == "half-open"
+
+    breaker.before_call()
+    with pytest.raises(GatewayUnavailable):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.before_call()
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 30
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(GatewayUnavailable):
+        breaker.before_call()
+
+def test_lost_probe_is_replaced_after_reset_timeout():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 30
+
+    breaker.before_call()
+    breaker.probe_started_at = time.monotonic() - 30
+    breaker.before_call()
+    with pytest.raises(GatewayUnavailable):
+        breaker.before_call()
@@ -0,0 +1,20 @@
+from app.analytics.counters import counters
+from app.database.database import SessionLocal
+from app.database.models import Song
+
+from tests.conftest import add_song
+
+def test_play_event_batch_raises_play_count(client):
+    add_song("s1")
+
+    response = client.post("/events/play", json={"events": [
+        {"song_id": "s1", "position": 0, "listened": 10},
+        {"song_id": "s1", "position": 10, "listened": 10},
+        {"song_id": "s1", "position": 0, "listened": 5},
+    ]})
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 3}
+
+    client.portal.call(counters.flush)
+    with SessionLocal() as db:
+        assert db.get(Song, "s1").play_count == 2
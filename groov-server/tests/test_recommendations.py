@@ -0,0 +1,39 @@
+from sqlalchemy import insert
+
+from app.analytics import recommendations as module
+from app.analytics.recommendations import RecommendationService
+from app.database.database import SessionLocal
+from app.database.models import user_downloads
+
+from tests.conftest import add_song, add_user
+
+def buy(user_id: str, *song_ids: str):
+    with SessionLocal() as db:
+        db.execute(insert(user_downloads), [{"user_id": user_id, "song_id": song_id} for song_id in song_ids])
+        db.commit()
+
+def test_refresh_caps_pairs_per_user(client, settings, monkeypatch):
+    monkeypatch.setattr(module, "RECOMMEND_MAX_ITEMS_PER_USER", 2)
+    add_user("rec-heavy")
+    add_user("rec-light")
+    for song_id in ("rec-a", "rec-b", "rec-c", "rec-d"):
+        add_song(song_id)
+    buy("rec-heavy", "rec-a", "rec-b", "rec-c")
+    buy("rec-light", "rec-a")
+
+    service = RecommendationService(path=settings.recommend_path, k=5)
+    service.rebuild()
+    before = int(service.state.counts.sum())
+
+    service.record("rec-heavy", "rec-d")
+    buy("rec-heavy", "rec-d")
+    service.record("rec-light", "rec-b")
+    service.record("rec-light", "rec-c")
+    buy("rec-light", "rec-b", "rec-c")
+    assert service.refresh() == 3
+
+    # rec-heavy 는 이미 상한만큼 보유해 새 쌍이 없고, rec-light 는 한 곡만 더 짝지어진다.
+    assert service.similar("rec-d") == []
+    assert int(service.state.counts.sum()) - before == 2
+    buyers = dict(zip(service.state.song_ids, service.state.buyers))
+    assert buyers["rec-d"] == 1 and buyers["rec-b"] == 2 and buyers["rec-c"] == 2
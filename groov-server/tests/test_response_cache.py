@@ -0,0 +1,16 @@
+from tests.conftest import add_song
+
+def test_catalog_revalidates_with_etag(client):
+    add_song("rc-song")
+
+    response = client.get("/songs", params={"limit": 100})
+    assert response.status_code == 200
+    assert "Last-Modified" not in response.headers
+    etag = response.headers["ETag"]
+
+    response = client.get("/songs", params={"limit": 100}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = client.get("/songs", params={"limit": 100}, headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
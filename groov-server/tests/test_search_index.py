@@ -0,0 +1,61 @@
+import pytest
+
+from app.search.index import SearchIndex, substring_distance
+
+SONGS = [
+    ("1", "Dream", "artist"),
+    ("2", "Summer Night", "artist"),
+    ("3", "밤편지", "아이유"),
+    ("4", "봄날", "방탄소년단"),
+    ("5", "봄날 노래", "artist"),
+    ("6", "Sunrise", "artist"),
+]
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    for song_id, title, description in SONGS:
+        index.add(song_id, title, description)
+    return index
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("dreem", "1"),  # 치환
+        ("dram", "1"),  # 삭제
+        ("Sumer", "2"),  # 삭제
+        ("nigth", "2"),  # 전치
+        ("밤편기", "3"),  # 음절 치환
+        ("봄낳", "4"),  # 받침 치환
+        ("봄나 노래", "5"),  # 띄어쓴 단어 중간의 오타
+    ],
+)
+def test_typo_tolerance(index, query, expected):
+    assert expected in index.search(query)
+
+def test_exact_match_ranks_first(index):
+    assert index.search("봄날")[0] == "4"
+    assert index.search("dream")[0] == "1"
+
+def test_unrelated_query_returns_nothing(index):
+    assert index.search("zzzz") == []
+
+def test_description_match(index):
+    assert index.search("아이유") == ["3"]
+
+def test_remove(index):
+    index.remove("1")
+    assert "1" not in index.search("dream")
+
+def test_substring_distance_counts_transposition_once():
+    assert substring_distance("nigth", "summernight") == 1
+    assert substring_distance("abc", "xxabcxx") == 0
+
+def test_substring_distance_stops_at_max_distance():
+    assert substring_distance("nigth", "summernight", max_distance=1) == 1
+    assert substring_distance("zzzzzz", "summernight", max_distance=2) == 3
+    assert substring_distance("zzzzzz", "summernight") == 6
+
+def test_long_query_uses_its_prefix(index):
+    index.add("7", "Long Summer Night Drive", "artist")
+    assert index.search("long summer night drive and the rest of a very long query")[0] == "7"
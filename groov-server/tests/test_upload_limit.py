@@ -0,0 +1,46 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.utils import upload
+from app.utils.upload import UploadSizeLimitMiddleware
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(upload, "MAX_AUDIO_SIZE", 1024)
+    monkeypatch.setattr(upload, "MAX_IMAGE_SIZE", 1024)
+    monkeypatch.setattr(upload, "MULTIPART_OVERHEAD", 1024)
+
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware)
+
+    @app.post("/upload")
+    async def receive(audio_file: UploadFile = File(...)):
+        return {"size": len(await audio_file.read())}
+
+    @app.post("/echo")
+    async def echo(audio_file: UploadFile = File(...)):
+        return {"size": len(await audio_file.read())}
+
+    return TestClient(app)
+
+def test_upload_within_limit(client):
+    response = client.post("/upload", files={"audio_file": ("a.mp3", b"x" * 1024)})
+    assert response.status_code == 200
+    assert response.json() == {"size": 1024}
+
+def test_rejects_declared_content_length(client):
+    response = client.post("/upload", files={"audio_file": ("a.mp3", b"x" * 4096)})
+    assert response.status_code == 413
+
+def test_aborts_chunked_body_during_receive(client):
+    def body():
+        for _ in range(8):
+            yield b"x" * 1024
+
+    response = client.post("/upload", content=body(), headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+
+def test_other_routes_are_not_limited(client):
+    response = client.post("/echo", files={"audio_file": ("a.mp3", b"x" * 4096)})
+    assert response.status_code == 200
@@ -0,0 +1,55 @@
+import hashlib
+
+import pytest
+from fastapi import APIRouter, FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.settings import Settings
+from app.utils.upload import StagingRoute, stage_upload
+
+@pytest.fixture
+def tmp_dir(tmp_path):
+    return tmp_path / "tmp"
+
+@pytest.fixture
+def client(tmp_dir):
+    router = APIRouter(route_class=StagingRoute)
+
+    @router.post("/stage")
+    async def stage(audio_file: UploadFile = File(...)):
+        staged = await stage_upload(audio_file, tmp_dir, 1024)
+        return {"path": str(staged.path), "size": staged.size, "sha256": staged.sha256}
+
+    @router.post("/ignore")
+    async def ignore(audio_file: UploadFile = File(...)):
+        return {}
+
+    app = FastAPI()
+    app.state.settings = Settings(upload_tmp_dir=tmp_dir)
+    app.include_router(router)
+    return TestClient(app)
+
+def test_stages_the_received_file_without_copying(client, tmp_dir):
+    body = b"ID3" + b"x" * 500
+    response = client.post("/stage", files={"audio_file": ("a.mp3", body)})
+    assert response.status_code == 200
+    staged = response.json()
+    assert staged["size"] == len(body)
+    assert staged["sha256"] == hashlib.sha256(body).hexdigest()
+    # 수신한 파일 하나만 tmp_dir 에 남는다.
+    assert [str(path) for path in tmp_dir.iterdir()] == [staged["path"]]
+
+def test_unclaimed_parts_are_removed(client, tmp_dir):
+    response = client.post("/ignore", files={"audio_file": ("a.mp3", b"x" * 100)})
+    assert response.status_code == 200
+    assert list(tmp_dir.iterdir()) == []
+
+def test_oversize_file_is_rejected(client, tmp_dir):
+    response = client.post("/stage", files={"audio_file": ("a.mp3", b"x" * 2048)})
+    assert response.status_code == 413
+    assert list(tmp_dir.iterdir()) == []
+
+def test_empty_file_is_rejected(client, tmp_dir):
+    response = client.post("/stage", files={"audio_file": ("a.mp3", b"")})
+    assert response.status_code == 400
+    assert list(tmp_dir.iterdir()) == []